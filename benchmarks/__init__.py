@@ -0,0 +1,8 @@
+"""Performance benchmarks.
+
+Every dataset size is generated once into its own SQLite database in the work
+directory and reused by the later runs. The engine calls are timed against it
+and the fastest runs are compared with the stored baseline.
+
+Run with `make bench` or `python -m benchmarks --help`.
+"""
@@ -0,0 +1,130 @@
+import sys
+import platform
+from pathlib import Path
+from datetime import date, datetime, timezone
+from typing import List
+
+import typer
+
+from benchmarks.generator import DATASETS
+
+
+BENCHMARKS_DIR = Path(__file__).parent.absolute()
+
+app = typer.Typer(name="benchmarks", help="Traktor performance benchmarks.")
+
+
+@app.command()
+def main(
+    datasets: List[str] = typer.Option(
+        ["1k", "100k"],
+        "--dataset",
+        "-d",
+        help=f"Datasets to run: {', '.join(DATASETS)}.",
+    ),
+    workdir: Path = typer.Option(
+        Path("~/.cache/traktor-benchmarks").expanduser(),
+        file_okay=False,
+        resolve_path=True,
+        help="Directory for the generated databases.",
+    ),
+    baseline: Path = typer.Option(
+        BENCHMARKS_DIR / "baseline.json",
+        dir_okay=False,
+        resolve_path=True,
+        help="Baseline to compare the results with.",
+    ),
+    repeat: int = typer.Option(15, min=1, help="Number of runs per call."),
+    tolerance: float = typer.Option(
+        0.25, min=0.0, help="Allowed slowdown relative to the baseline."
+    ),
+    end: str = typer.Option(
+        None,
+        help="Day the generated history ends (YYYY-MM-DD), today by default.",
+    ),
+    save: bool = typer.Option(
+        False, "--save", help="Store the results as the new baseline."
+    ),
+):
+    """Run the benchmarks and compare them with the baseline.
+
+    Exits with status 1 if any benchmark is slower than the baseline by more
+    than the tolerance.
+    """
+    unknown = [name for name in datasets if name not in DATASETS]
+    if len(unknown) > 0:
+        raise typer.BadParameter(
+            f"Unknown datasets: {', '.join(unknown)}", param_hint="--dataset"
+        )
+    try:
+        end_day = (
+            datetime.now(timezone.utc).date()
+            if end is None
+            else date.fromisoformat(end)
+        )
+    except ValueError:
+        raise typer.BadParameter(f"Invalid date: {end}", param_hint="--end")
+
+    # Keep everything, the export watermark included, in the work directory.
+    # Days of the daily totals depend on the timezone, so it's fixed too.
+    import pytz
+    from traktor.config import config
+
+    workdir.mkdir(parents=True, exist_ok=True)
+    config.config_dir = workdir
+    config.db_name = str(workdir / "benchmarks.db")
+    config.timezone = pytz.utc
+
+    from traktor.bootstrap import setup
+
+    setup()
+
+    from rich.console import Console
+    from benchmarks import suite
+
+    console = Console()
+    calibration = suite.calibrate()
+    results = suite.run(
+        datasets=[DATASETS[name] for name in datasets],
+        workdir=workdir,
+        end=end_day,
+        repeat=repeat,
+        progress=lambda message: console.print(message, style="dim"),
+    )
+
+    document = suite.read_baseline(baseline)
+    stored = document["results"]
+    scale = calibration / document["metadata"].get("calibration", calibration)
+    for result in results:
+        value = stored.get(result.dataset, {}).get(result.name)
+        result.baseline = None if value is None else value * scale
+        result.tolerance = tolerance
+
+    table = suite.Result.get_rich_table()
+    for result in results:
+        table.add_row(*result.to_rich_row())
+    console.print(table)
+    console.print(
+        f"Baseline scaled by {scale:.2f} to the speed of this machine.",
+        style="dim",
+    )
+
+    if save:
+        suite.write_baseline(
+            baseline,
+            results=results,
+            metadata={
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "calibration": round(calibration, 6),
+            },
+        )
+        console.print(f"Baseline written to {baseline}")
+    elif any(result.regressed for result in results):
+        console.print("Some benchmarks regressed.", style="red")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    app()
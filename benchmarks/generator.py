@@ -0,0 +1,184 @@
+"""Deterministic synthetic dataset generator.
+
+The same dataset and the same end date always produce the same rows, ids
+included, so timings from different runs and machines are comparable.
+"""
+
+import uuid
+import random
+import itertools
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator, List
+
+from slugify import slugify
+from django.db import transaction
+
+
+@dataclass(frozen=True)
+class Dataset:
+    """Shape of the generated data.
+
+    Args:
+        name (str): Name used for the database file and in the results.
+        users (int): Number of users.
+        projects (int): Number of projects per user.
+        tasks (int): Number of tasks per project, default task included.
+        years (int): Number of years of history.
+        entries (int): Total number of entries.
+        seed (int): Seed of the random generator.
+    """
+
+    name: str
+    users: int
+    projects: int
+    tasks: int
+    years: int
+    entries: int
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+DATASETS = {
+    dataset.name: dataset
+    for dataset in [
+        Dataset(
+            name="1k", users=1, projects=3, tasks=3, years=1, entries=1_000
+        ),
+        Dataset(
+            name="100k",
+            users=2,
+            projects=5,
+            tasks=5,
+            years=5,
+            entries=100_000,
+        ),
+        Dataset(
+            name="1M",
+            users=5,
+            projects=10,
+            tasks=10,
+            years=10,
+            entries=1_000_000,
+        ),
+    ]
+}
+
+
+class Generator:
+    """Fill the current database with a dataset.
+
+    Rows are inserted with `bulk_create`, which bypasses the model signals,
+    so the default tasks are created explicitly and the daily totals are
+    rebuilt at the end.
+
+    Args:
+        dataset (Dataset): Shape of the data.
+        end (date): Day the history ends, in UTC. Entries end before it.
+        batch_size (int): Number of rows inserted at once.
+    """
+
+    def __init__(self, dataset: Dataset, end: date, batch_size: int = 5000):
+        self.dataset = dataset
+        self.end = datetime.combine(end, time(), tzinfo=timezone.utc)
+        self.batch_size = batch_size
+        self.random = random.Random(dataset.seed)
+
+    def _uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.random.getrandbits(128), version=4)
+
+    def create_users(self) -> list:
+        """Create the users, the superuser created by the migrations first."""
+        from traktor.models import User
+
+        return [User.get_superuser()] + [
+            User.objects.create(username=f"user{i}")
+            for i in range(2, self.dataset.users + 1)
+        ]
+
+    def _projects(self, users: list) -> list:
+        from traktor.models import Project
+
+        return [
+            Project(
+                id=self._uuid(),
+                user=user,
+                name=f"Project {i}",
+                slug=slugify(f"Project {i}"),
+            )
+            for user in users
+            for i in range(1, self.dataset.projects + 1)
+        ]
+
+    def _tasks(self, projects: list) -> list:
+        from traktor.models import Task
+
+        tasks = []
+        for project in projects:
+            for i in range(self.dataset.tasks):
+                name = "Default" if i == 0 else f"Task {i}"
+                tasks.append(
+                    Task(
+                        id=self._uuid(),
+                        project=project,
+                        name=name,
+                        slug=slugify(name),
+                        default=i == 0,
+                    )
+                )
+        return tasks
+
+    def _entries(self, user_tasks: List[list]) -> Iterator:
+        """Generate non-overlapping entries evenly spread over the history.
+
+        Every user gets an equal share of the entries. The history is split
+        into one slot per entry and every entry starts somewhere at the
+        beginning of its slot and lasts up to most of it.
+        """
+        from traktor.models import Entry
+
+        start = self.end - timedelta(days=365 * self.dataset.years)
+        span = (self.end - start).total_seconds()
+        count, remainder = divmod(self.dataset.entries, len(user_tasks))
+        for n, tasks in enumerate(user_tasks):
+            n_entries = count + (1 if n < remainder else 0)
+            slot = span / n_entries
+            for i in range(n_entries):
+                offset = self.random.uniform(0.0, 0.1) * slot
+                duration = int(self.random.uniform(0.3, 0.9) * slot)
+                start_time = start + timedelta(seconds=i * slot + offset)
+                yield Entry(
+                    id=self._uuid(),
+                    task=self.random.choice(tasks),
+                    start_time=start_time,
+                    end_time=start_time + timedelta(seconds=duration),
+                    duration=duration,
+                )
+
+    def _bulk_create(self, model, objs):
+        objs = iter(objs)
+        while True:
+            batch = list(itertools.islice(objs, self.batch_size))
+            if len(batch) == 0:
+                return
+            model.objects.bulk_create(batch)
+
+    def generate(self):
+        """Insert the dataset in a single transaction."""
+        from traktor.models import Project, Task, Entry, DailyTotal
+
+        with transaction.atomic():
+            users = self.create_users()
+            projects = self._projects(users)
+            self._bulk_create(Project, projects)
+            tasks = self._tasks(projects)
+            self._bulk_create(Task, tasks)
+
+            user_tasks = [
+                [task for task in tasks if task.project.user is user]
+                for user in users
+            ]
+            self._bulk_create(Entry, self._entries(user_tasks))
+            DailyTotal.rebuild(batch_size=self.batch_size)
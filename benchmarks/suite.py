@@ -0,0 +1,343 @@
+"""Timed engine calls and the comparison with the baseline."""
+
+import time
+import sqlite3
+import statistics
+from pathlib import Path
+from datetime import date
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from tea import serde
+from tea_console.table import Column, RichTableMixin
+
+from benchmarks.generator import Dataset, Generator
+
+
+# Absolute slowdown in seconds that is always allowed. Calls that take a few
+# milliseconds vary by more than the relative tolerance from run to run.
+SLACK = 0.0025
+
+
+@dataclass
+class Result(RichTableMixin):
+    """Times of a benchmark and their comparison with the baseline.
+
+    The fastest run is compared, since it's the least disturbed by the
+    other processes, like in the calibration. A call regressed if it's
+    slower than the baseline by more than the tolerance and the slack.
+    """
+
+    HEADERS = [
+        Column(title="Dataset", path="dataset"),
+        Column(title="Benchmark", path="name"),
+        Column(
+            title="Median (ms)", path="median_ms", align=Column.Align.right
+        ),
+        Column(title="Min (ms)", path="min_ms", align=Column.Align.right),
+        Column(
+            title="Baseline (ms)", path="baseline_ms", align=Column.Align.right
+        ),
+        Column(title="Change", path="change_str", align=Column.Align.right),
+        Column(title="Status", path="status"),
+    ]
+
+    dataset: str
+    name: str
+    times: List[float]
+    baseline: Optional[float] = None
+    tolerance: float = 0.25
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.times)
+
+    @property
+    def median_ms(self) -> str:
+        return f"{self.median * 1000:.2f}"
+
+    @property
+    def min_ms(self) -> str:
+        return f"{self.best * 1000:.2f}"
+
+    @property
+    def baseline_ms(self) -> str:
+        return "" if self.baseline is None else f"{self.baseline * 1000:.2f}"
+
+    @property
+    def best(self) -> float:
+        return min(self.times)
+
+    @property
+    def change(self) -> Optional[float]:
+        if self.baseline is None or self.baseline == 0:
+            return None
+        return self.best / self.baseline - 1
+
+    @property
+    def change_str(self) -> str:
+        return "" if self.change is None else f"{self.change:+.0%}"
+
+    @property
+    def regressed(self) -> bool:
+        if self.baseline is None:
+            return False
+        allowed = max(
+            self.baseline * (1 + self.tolerance), self.baseline + SLACK
+        )
+        return self.best > allowed
+
+    @property
+    def status(self) -> str:
+        if self.baseline is None:
+            return "[cyan]new[/cyan]"
+        if self.regressed:
+            return "[red]regressed[/red]"
+        return "[green]ok[/green]"
+
+    def to_dict(self) -> dict:
+        return {
+            "dataset": self.dataset,
+            "name": self.name,
+            "median": self.median,
+            "min": self.best,
+            "baseline": self.baseline,
+            "change": self.change,
+            "regressed": self.regressed,
+        }
+
+
+@dataclass
+class Benchmark:
+    """Timed call.
+
+    Args:
+        name (str): Benchmark name.
+        func (callable): Timed function.
+        setup (callable, optional): Called before every run, not timed.
+        teardown (callable, optional): Called after every run, not timed.
+        repeat (int, optional): Number of runs if different from the suite
+            default. Slow calls are run fewer times.
+    """
+
+    name: str
+    func: Callable
+    setup: Optional[Callable] = None
+    teardown: Optional[Callable] = None
+    repeat: Optional[int] = None
+
+    def run(self, repeat: int) -> List[float]:
+        times = []
+        for _ in range(self.repeat or repeat):
+            if self.setup is not None:
+                self.setup()
+            start = time.perf_counter()
+            self.func()
+            times.append(time.perf_counter() - start)
+            if self.teardown is not None:
+                self.teardown()
+        return times
+
+
+def use_database(path: Path):
+    """Point the connection to a different SQLite database and migrate it."""
+    from django.db import connection
+    from traktor.config import config
+    from traktor.engine import engine
+    from traktor.engine.slug_cache import slug_cache
+
+    connection.close()
+    config.db_name = str(path)
+    connection.settings_dict["NAME"] = str(path)
+    slug_cache.clear()
+    engine.db.ensure()
+
+
+def prepare(dataset: Dataset, workdir: Path, end: date) -> Path:
+    """Generate the dataset database unless it's already generated.
+
+    The database is reused if it was generated from the same dataset and
+    end date. Its description is stored next to it.
+    """
+    path = workdir / f"{dataset.name}.db"
+    meta_path = workdir / f"{dataset.name}.json"
+    meta = {"dataset": dataset.to_dict(), "end": end.isoformat()}
+    if path.is_file() and meta_path.is_file():
+        if serde.json_loads(meta_path.read_text(encoding="utf-8")) == meta:
+            return path
+
+    for stale in workdir.glob(f"{dataset.name}.db*"):
+        stale.unlink()
+    use_database(path)
+    Generator(dataset=dataset, end=end).generate()
+    meta_path.write_text(serde.json_dumps(meta), encoding="utf-8")
+    return path
+
+
+def benchmarks(dataset: Dataset, workdir: Path, end: date) -> List[Benchmark]:
+    """Create the benchmarks for a generated dataset."""
+    from traktor.engine import engine
+    from traktor.models import User, Entry
+
+    path = workdir / f"{dataset.name}.db"
+    export_path = workdir / f"{dataset.name}-export.json"
+    load_path = workdir / f"{dataset.name}-load.db"
+    user = User.objects.get(username="admin")
+    project_id = "project-1"
+
+    created = []
+
+    def timer_start():
+        created.append(engine.timer_start(user=user, project_id=project_id))
+
+    def timer_stop():
+        engine.timer_stop(user=user)
+
+    def delete_entries():
+        # Keep the dataset unchanged for the next runs
+        Entry.objects.filter(pk__in=[entry.pk for entry in created]).delete()
+        created.clear()
+
+    def stop_and_delete():
+        timer_stop()
+        delete_entries()
+
+    def empty_database():
+        for stale in workdir.glob(f"{load_path.name}*"):
+            stale.unlink()
+        use_database(load_path)
+        Generator(dataset=dataset, end=end).create_users()
+
+    def restore_database():
+        use_database(path)
+        for stale in workdir.glob(f"{load_path.name}*"):
+            stale.unlink()
+
+    return [
+        Benchmark(
+            name="timer_start", func=timer_start, teardown=stop_and_delete
+        ),
+        Benchmark(
+            name="timer_status",
+            func=lambda: engine.timer_status(user=user),
+            setup=timer_start,
+            teardown=stop_and_delete,
+        ),
+        Benchmark(
+            name="timer_stop",
+            func=timer_stop,
+            setup=timer_start,
+            teardown=delete_entries,
+        ),
+        Benchmark(name="timer_today", func=lambda: engine.timer_today(user)),
+        Benchmark(
+            name="timer_report",
+            func=lambda: engine.timer_report(user=user, days=0),
+        ),
+        Benchmark(
+            name="project_list", func=lambda: engine.project_list(user=user)
+        ),
+        Benchmark(
+            name="task_list",
+            func=lambda: engine.task_list(user=user, project_id=None),
+        ),
+        Benchmark(
+            name="db_export",
+            func=lambda: engine.db.export(path=export_path),
+            repeat=3,
+        ),
+        Benchmark(
+            name="db_load",
+            func=lambda: engine.db.load(path=export_path),
+            setup=empty_database,
+            teardown=restore_database,
+            repeat=3,
+        ),
+    ]
+
+
+def run(
+    datasets: List[Dataset],
+    workdir: Path,
+    end: date,
+    repeat: int,
+    progress: Callable[[str], None],
+) -> List[Result]:
+    """Generate the datasets and run the benchmarks on every one of them."""
+    results = []
+    for dataset in datasets:
+        progress(f"Preparing {dataset.name} dataset")
+        path = prepare(dataset=dataset, workdir=workdir, end=end)
+        use_database(path)
+        for benchmark in benchmarks(dataset=dataset, workdir=workdir, end=end):
+            progress(f"Running {dataset.name} {benchmark.name}")
+            results.append(
+                Result(
+                    dataset=dataset.name,
+                    name=benchmark.name,
+                    times=benchmark.run(repeat=repeat),
+                )
+            )
+        (workdir / f"{dataset.name}-export.json").unlink()
+    return results
+
+
+def calibrate(repeat: int = 10) -> float:
+    """Time a fixed workload that doesn't depend on traktor.
+
+    Python and SQLite work similar to what the benchmarks do. The baseline
+    is scaled by the ratio of the calibrations, so that a slower or busier
+    machine doesn't report every benchmark as regressed.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        db = sqlite3.connect(":memory:")
+        db.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, k TEXT, v REAL)")
+        db.executemany(
+            "INSERT INTO t (k, v) VALUES (?, ?)",
+            ((f"key-{i % 97}", i * 0.5) for i in range(50_000)),
+        )
+        rows = db.execute("SELECT k, SUM(v) FROM t GROUP BY k").fetchall()
+        db.close()
+        serde.json_dumps([{"key": k, "value": v} for k, v in rows * 100])
+        times.append(time.perf_counter() - start)
+    # The fastest run is the least disturbed by the other processes
+    return min(times)
+
+
+def read_baseline(path: Path) -> dict:
+    """Read the baseline document.
+
+    Results are the fastest times in seconds by dataset and benchmark name.
+    """
+    if not path.is_file():
+        return {"metadata": {}, "results": {}}
+    return serde.json_loads(path.read_text(encoding="utf-8"))
+
+
+def write_baseline(path: Path, results: List[Result], metadata: dict):
+    """Store the fastest times as the new baseline.
+
+    Results of the datasets that were not run are kept, rescaled to the new
+    calibration.
+    """
+    document = read_baseline(path)
+    baseline = document["results"]
+    old, new = document["metadata"].get("calibration"), metadata["calibration"]
+    if old:
+        baseline = {
+            dataset: {
+                name: round(value * new / old, 6)
+                for name, value in values.items()
+            }
+            for dataset, values in baseline.items()
+        }
+    for result in results:
+        baseline.setdefault(result.dataset, {})[result.name] = round(
+            result.best, 6
+        )
+    path.write_text(
+        serde.json_dumps({"metadata": metadata, "results": baseline}) + "\n",
+        encoding="utf-8",
+    )
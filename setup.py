@@ -36,9 +36,10 @@ setup(
         "Operating System :: OS Independent",
     ],
     license="Apache-2.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*"]),
     include_package_data=True,
     install_requires=io.open("requirements.txt").read().splitlines(),
+    extras_require={"numpy": ["numpy>=1.19"]},
     entry_points="""
         [console_scripts]
         traktor=traktor.__main__:main
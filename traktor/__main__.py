@@ -1,8 +1,34 @@
+import os
+import sys
 from pathlib import Path
-from tea_django.main import Main
 
 
-main = Main(app_name="traktor", app_dir=Path(__file__).parents[1])
+def main():
+    # Make the package importable when running from the source directory
+    app_dir = str(Path(__file__).parents[1].absolute())
+    if app_dir not in sys.path:
+        sys.path.insert(0, app_dir)
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "traktor.settings")
+
+    args = sys.argv[1:]
+    if len(args) > 0 and args[0] == "manage":
+        # Django management commands
+        from traktor.bootstrap import setup
+        from django.core.management import execute_from_command_line
+
+        setup()
+        execute_from_command_line(["traktor", *args[1:]])
+    else:
+        # Let the daemon execute the command if it's running
+        from traktor.daemon import forward
+
+        exit_code = forward(args)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+        from traktor.commands import app
+
+        app(prog_name="traktor")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from traktor.models import User, Project, Task, Entry
+from traktor.models import User, Project, Task, Entry, ArchivedEntry
 
 
 def name(s: str):
@@ -118,3 +118,6 @@ class EntryAdmin(admin.ModelAdmin):
     @name("Task")
     def task_name(self, obj):
         return obj.task.name
+
+
+admin.register(ArchivedEntry)(EntryAdmin)
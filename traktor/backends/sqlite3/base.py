@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite backend that starts transactions with `BEGIN IMMEDIATE`.
+
+    Default `BEGIN` is deferred: the write lock is taken at the first write,
+    and if another connection wrote in the meantime the transaction fails
+    with "database is locked" without waiting for the busy timeout. Taking
+    the write lock at the start makes concurrent writers wait for each other
+    instead.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
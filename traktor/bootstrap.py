@@ -0,0 +1,17 @@
+import os
+
+
+def setup():
+    """Set up Django if it's not already set up.
+
+    Django setup is the most expensive part of the application startup, so
+    it's done only when a command actually needs the database.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "traktor.settings")
+
+    from django.apps import apps
+
+    if not apps.ready:
+        import django
+
+        django.setup()
@@ -1,21 +1,117 @@
 from pathlib import Path
+from datetime import datetime
+from typing import List, Optional
 
 import typer
-from tea_console.console import command
 
-from traktor.engine import engine
+from traktor import errors
+from traktor.config import config
+from traktor.enums import Compression
+from traktor.commands.utils import parse_date, parse_timestamp
+from traktor.commands.lazy import command, get_engine
 
 
-app = typer.Typer(name="db", help="Database export/import.")
+app = typer.Typer(name="db", help="Database export/import and backup/restore.")
+
+
+def __output_progress(count: int, rate: float):
+    """Output import progress on a single line."""
+    typer.echo(
+        f"\rImported {count} rows ({rate:.0f} rows/sec)", err=True, nl=False
+    )
+
+
+def __parse_since(since: str) -> datetime:
+    """Parse `last` or an ISO 8601 timestamp in the configured timezone."""
+    if since == "last":
+        watermark = get_engine().db.export_watermark()
+        if watermark is None:
+            raise errors.ExportWatermarkNotFound()
+        return watermark
+
+    return parse_timestamp(since, param_hint="--since")
 
 
 @command(app, name="export")
-def export(path: Path):
+def export(
+    path: Path,
+    since: Optional[str] = typer.Option(
+        None,
+        metavar="timestamp|last",
+        help="Export only changes since the timestamp or the last export.",
+    ),
+):
     """Export database to JSON document."""
-    engine.db.export(path=path)
+    get_engine().db.ensure()
+    get_engine().db.export(
+        path=path, since=None if since is None else __parse_since(since)
+    )
 
 
 @command(app, name="import")
-def load(path: Path):
-    """Import database export from JSON document."""
-    engine.db.load(path=path)
+def load(paths: List[Path]):
+    """Import database exports from JSON documents.
+
+    Pass the full export followed by delta exports to apply them in order.
+    """
+    get_engine().db.ensure()
+    if config.format == config.Format.text:
+        get_engine().db.load_chain(paths=paths, progress=__output_progress)
+        typer.echo(err=True)
+    else:
+        get_engine().db.load_chain(paths=paths)
+
+
+@command(app, name="backup")
+def backup(
+    path: Path,
+    compression: Compression = typer.Option(
+        Compression.none.value, help="Backup file compression."
+    ),
+):
+    """Create a binary snapshot of the SQLite database."""
+    get_engine().db.backup(path=path, compression=compression)
+
+
+@command(app, name="restore")
+def restore(path: Path):
+    """Restore the SQLite database from a binary snapshot."""
+    get_engine().db.restore(path=path)
+
+
+@command(app, name="archive")
+def archive(
+    before: str = typer.Option(
+        ...,
+        metavar="date",
+        help="Archive the entries that ended before the date.",
+    ),
+):
+    """Move old finished entries to the archive.
+
+    Reports are not affected. Entry listings read the archive only when the
+    listed range needs it, so the entries table stays small.
+    """
+    from traktor.models.daily_total import day_start
+
+    get_engine().db.ensure()
+    count = get_engine().db.archive(
+        before=day_start(parse_date(before, "--before"))
+    )
+    if config.format == config.Format.text:
+        typer.echo(f"Archived {count} entries.", err=True)
+
+
+@command(app, name="rebuild-rollups")
+def rebuild_rollups():
+    """Regenerate the daily totals used by the reports.
+
+    Run it after changing the timezone in the configuration.
+    """
+    get_engine().db.rebuild_rollups()
+
+
+@command(app, name="rebuild-search")
+def rebuild_search():
+    """Regenerate the full-text search index of the entries."""
+    get_engine().db.rebuild_search()
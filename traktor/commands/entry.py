@@ -0,0 +1,96 @@
+from typing import Optional
+
+import typer
+
+from traktor.commands.lazy import command, get_engine, get_user
+from traktor.commands.utils import (
+    local_timestamp,
+    output_stream,
+    parse_timestamp,
+)
+
+
+app = typer.Typer(name="entry", help="Entry commands.")
+
+
+COLUMNS = [
+    ("Project", 20, lambda o: o.task.project.name),
+    ("Task", 20, lambda o: o.task.name),
+    ("Start Time", 19, lambda o: local_timestamp(o.start_time)),
+    ("End Time", 19, lambda o: local_timestamp(o.end_time)),
+    ("Duration", 14, lambda o: o.running_time),
+]
+
+
+@app.callback()
+def callback():
+    # Make sure that the database exists and it's migrated to the latest
+    # version
+    get_engine().db.ensure()
+
+
+@command(app, name="list")
+def list_entries(
+    start: Optional[str] = typer.Option(
+        None,
+        "--from",
+        metavar="timestamp",
+        help="List entries started at or after the date or timestamp.",
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--to",
+        metavar="timestamp",
+        help="List entries started before the date or timestamp.",
+    ),
+    project: Optional[str] = typer.Option(None, help="Project ID."),
+    task: Optional[str] = typer.Option(None, help="Task ID."),
+):
+    """List entries ordered by start time.
+
+    Entries are printed as they are read from the database, so even a long
+    history starts printing immediately.
+    """
+    entries = get_engine().entry_list(
+        user=get_user(),
+        start=None if start is None else parse_timestamp(start, "--from"),
+        end=None if end is None else parse_timestamp(end, "--to"),
+        project_id=project,
+        task_id=task,
+    )
+    output_stream(name="entries", columns=COLUMNS, objs=entries)
+
+
+@command(app, model="traktor.models.Hit")
+def search(
+    query: str = typer.Argument(..., help="Search query."),
+    start: Optional[str] = typer.Option(
+        None,
+        "--from",
+        metavar="timestamp",
+        help="Search entries started at or after the date or timestamp.",
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--to",
+        metavar="timestamp",
+        help="Search entries started before the date or timestamp.",
+    ),
+    project: Optional[str] = typer.Option(None, help="Project ID."),
+    task: Optional[str] = typer.Option(None, help="Task ID."),
+    limit: int = typer.Option(20, min=1, help="Maximal number of matches."),
+):
+    """Search entry descriptions and notes, best matches first.
+
+    The query supports the SQLite full-text syntax, e.g. `deploy AND prod*`
+    or `"code review"`.
+    """
+    return get_engine().entry_search(
+        user=get_user(),
+        query=query,
+        start=None if start is None else parse_timestamp(start, "--from"),
+        end=None if end is None else parse_timestamp(end, "--to"),
+        project_id=project,
+        task_id=task,
+        limit=limit,
+    )
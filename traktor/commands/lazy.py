@@ -0,0 +1,63 @@
+"""Helpers for commands that load Django and the engine only when needed.
+
+Importing Django, setting it up and importing the models takes most of the
+application startup time. Command modules should not import the engine or the
+models at the module level, so that `traktor --help` or `traktor config`
+don't pay for it.
+"""
+
+import functools
+from typing import Optional
+
+import typer
+from tea_console import console
+
+from traktor.config import config
+from traktor.bootstrap import setup
+
+
+def get_engine():
+    """Set up Django and return the engine."""
+    setup()
+    from traktor.engine import engine
+
+    return engine
+
+
+def get_user():
+    """Set up Django and return the selected user."""
+    setup()
+    from traktor.models import User
+
+    return User.objects.get(username=config.selected_user)
+
+
+def command(
+    app: typer.Typer,
+    model: Optional[str] = None,
+    name: Optional[str] = None,
+    **kwargs,
+):
+    """Register a command that sets up Django only when it's invoked.
+
+    Same as `tea_console.console.command`, but the output model is passed as
+    a dotted path (e.g. `"traktor.models.Entry"`) and imported after Django
+    is set up.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kw):
+            setup()
+            from django.utils.module_loading import import_string
+
+            result = func(*args, **kw)
+            if result is None or model is None:
+                return result
+            console.output(
+                fmt=config.format, model=import_string(model), objs=result
+            )
+
+        return console.command(app, name=name, **kwargs)(wrapper)
+
+    return decorator
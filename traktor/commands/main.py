@@ -2,16 +2,17 @@ import typer
 from pathlib import Path
 from typing import Optional
 
-from tea_console.console import command
 from tea_console.enums import ConsoleFormat
 from tea_console.commands.config import app as config_app
 
 from traktor.config import config
+from traktor.bootstrap import setup
+from traktor.commands.lazy import command
 from traktor.commands.db import app as db_app
 from traktor.commands.project import app as project_app
 from traktor.commands.task import app as task_app
+from traktor.commands.entry import app as entry_app
 from traktor.commands import timer
-from traktor.models import Entry, Report
 
 
 app = typer.Typer(name="traktor", help="Personal time tracking.")
@@ -24,18 +25,20 @@ app.add_typer(config_app)
 app.add_typer(db_app)
 app.add_typer(project_app)
 app.add_typer(task_app)
+app.add_typer(entry_app)
 
 
 # Add timer commands as top level
 command(app)(timer.status)
-command(app, model=Entry)(timer.start)
-command(app, model=Entry)(timer.stop)
-command(app, model=Report)(timer.today)
-command(app, model=Report)(timer.report)
+command(app, model="traktor.models.Entry")(timer.start)
+command(app, model="traktor.models.Entry")(timer.stop)
+command(app, model="traktor.models.Report")(timer.today)
+command(app)(timer.report)
 
 
 @app.callback()
 def callback(
+    ctx: typer.Context,
     config_path: Path = typer.Option(
         default=None,
         help="Path to the configuration.",
@@ -52,7 +55,26 @@ def callback(
     user: Optional[str] = typer.Option(
         None, metavar="username", help="Optionally select different user."
     ),
+    profile: bool = typer.Option(
+        False,
+        envvar="TRAKTOR_PROFILE",
+        help="Print time and SQL queries of the engine calls to stderr.",
+    ),
+    profile_stats: Optional[Path] = typer.Option(
+        None,
+        envvar="TRAKTOR_PROFILE_STATS",
+        dir_okay=False,
+        writable=True,
+        resolve_path=True,
+        help="Write cProfile statistics to this file (implies --profile).",
+    ),
 ):
+    if profile or profile_stats is not None:
+        from traktor.profiler import profiler
+
+        profiler.enable(stats_path=profile_stats)
+        ctx.call_on_close(profiler.report)
+
     if config_path is not None:
         config.config_path = config_path
 
@@ -63,11 +85,21 @@ def callback(
         config.set_user(user)
 
 
+@command(app, name="daemon")
+def run_daemon():
+    """Run the daemon that executes timer commands without startup cost."""
+    from traktor.daemon import serve
+
+    serve()
+
+
 @app.command(hidden=True)
 def shell():
     """Run IPython shell with loaded configuration and models."""
     try:
         from IPython import embed
+
+        setup()
         from traktor.config import config
         from traktor.engine import engine
         from traktor.models import User, Project, Task, Entry, Report
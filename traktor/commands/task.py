@@ -1,28 +1,27 @@
 from typing import Optional
 
 import typer
-from tea_console.console import command
 
-from traktor.config import config
-from traktor.engine import engine
-from traktor.models import User, Task
+from traktor.commands.lazy import command, get_engine, get_user
 
 
 app = typer.Typer(name="task", help="Task commands.")
 
 
-# Make sure that the database exists and it's migrated to the latest version
-app.callback()(engine.db.ensure)
+@app.callback()
+def callback():
+    # Make sure that the database exists and it's migrated to the latest
+    # version
+    get_engine().db.ensure()
 
 
-@command(app, model=Task, name="list")
+@command(app, model="traktor.models.Task", name="list")
 def list_tasks(project: Optional[str] = typer.Argument(None)):
     """List all tasks."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.task_list(user=user, project_id=project)
+    return get_engine().task_list(user=get_user(), project_id=project)
 
 
-@command(app, model=Task)
+@command(app, model="traktor.models.Task")
 def add(
     project: str,
     name: str,
@@ -30,13 +29,16 @@ def add(
     default: Optional[bool] = None,
 ):
     """Create a task."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.task_create(
-        user=user, project_id=project, name=name, color=color, default=default,
+    return get_engine().task_create(
+        user=get_user(),
+        project_id=project,
+        name=name,
+        color=color,
+        default=default,
     )
 
 
-@command(app, model=Task)
+@command(app, model="traktor.models.Task")
 def update(
     project: str,
     task_id: str,
@@ -47,9 +49,8 @@ def update(
     ),
 ):
     """Update a task."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.task_update(
-        user=user,
+    return get_engine().task_update(
+        user=get_user(),
         project_id=project,
         task_id=task_id,
         name=name,
@@ -61,5 +62,4 @@ def update(
 @command(app)
 def delete(project: str, task: str):
     """Delete a task."""
-    user = User.objects.get(username=config.selected_user)
-    engine.task_delete(user=user, project_id=project, task_id=task)
+    get_engine().task_delete(user=get_user(), project_id=project, task_id=task)
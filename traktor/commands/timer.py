@@ -1,31 +1,74 @@
 import time
+from datetime import timedelta
 from typing import Optional
 
 import typer
+from tea import serde
+from tea import timestamp as ts
 from tea_console.console import output
 
+from traktor import errors
 from traktor.config import config
-from traktor.engine import engine
-from traktor.models import User, Entry
+from traktor.enums import Bucket
+from traktor.commands.lazy import get_engine, get_user
+from traktor.commands.utils import parse_date
 
 
 def start(project: str, task: Optional[str] = typer.Argument(None)):
     """Start the timer."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.timer_start(user=user, project_id=project, task_id=task)
+    return get_engine().timer_start(
+        user=get_user(), project_id=project, task_id=task
+    )
 
 
 def stop():
     """Stop the timer."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.timer_stop(user=user)
+    return get_engine().timer_stop(user=get_user())
+
+
+def __render_status(entry):
+    """Render the running timer like the `output` does."""
+    from rich.text import Text
+    from traktor.models import Entry
+
+    if config.format == config.Format.json:
+        if entry is None:
+            return Text(
+                serde.json_dumps({"error": errors.TimerIsNotRunning().message})
+            )
+        return Text(serde.json_dumps(entry))
 
+    if entry is None:
+        return Text(errors.TimerIsNotRunning().message, style="red")
+    table = Entry.get_rich_table()
+    table.add_row(*entry.to_rich_row())
+    return table
 
-def __output_status(user: User) -> int:
-    """Output status and return number of lines printed."""
-    timer = engine.timer_status(user=user)
-    output(fmt=config.format, model=Entry, objs=timer)
-    return 2 if timer is None else 6
+
+def __watch_status(user):
+    """Show the running timer until interrupted.
+
+    Running entry is fetched once and the elapsed time is computed locally.
+    The entry is fetched again only when the database changes.
+    """
+    from rich.live import Live
+
+    engine = get_engine()
+    version, entry = None, None
+    try:
+        with Live(auto_refresh=False) as live:
+            while True:
+                current = engine.db.data_version()
+                if current is None or current != version:
+                    version = current
+                    try:
+                        entry = engine.timer_status(user=user)
+                    except errors.TimerIsNotRunning:
+                        entry = None
+                live.update(__render_status(entry), refresh=True)
+                time.sleep(1)
+    except KeyboardInterrupt:
+        return
 
 
 def status(
@@ -34,35 +77,66 @@ def status(
     )
 ):
     """See the current running timer."""
-    user = User.objects.get(username=config.selected_user)
+    user = get_user()
     if interactive:
-        no_lines = 0
-        while True:
-            try:
-                if no_lines > 0:
-                    print("\033[F" * no_lines)
-                    for _ in range(no_lines - 1):
-                        print("\033[K")
-                    print("\033[F" * no_lines)
-
-                no_lines = __output_status(user=user)
-                time.sleep(1)
-            except KeyboardInterrupt:
-                return
+        __watch_status(user=user)
     else:
-        __output_status(user=user)
+        from traktor.models import Entry
+
+        timer = get_engine().timer_status(user=user)
+        output(fmt=config.format, model=Entry, objs=timer)
 
 
 def today():
     """See today's timers."""
-    user = User.objects.get(username=config.selected_user)
-    return engine.timer_today(user=user)
-
-
-def report(days: int = typer.Argument(default=0, min=0)):
-    """See the current running timer.
+    return get_engine().timer_today(user=get_user())
+
+
+def report(
+    days: int = typer.Argument(default=0, min=0),
+    bucket: Optional[Bucket] = typer.Option(
+        None, help="Report a time series per day, week or month."
+    ),
+    start: Optional[str] = typer.Option(
+        None,
+        "--from",
+        metavar="date",
+        help="First day of the time series, overrides days.",
+    ),
+    end: Optional[str] = typer.Option(
+        None,
+        "--to",
+        metavar="date",
+        help="Day the time series ends, exclusive.",
+    ),
+):
+    """See the time spent per project and task.
 
-    If days is 0 that means whole history.
+    If days is 0 that means whole history. With `--bucket` the time is
+    reported per day, week or month.
     """
-    user = User.objects.get(username=config.selected_user)
-    return engine.timer_report(user=user, days=days)
+    from traktor.models import Report, Total
+
+    if bucket is None:
+        if start is not None or end is not None:
+            raise typer.BadParameter(
+                "--from and --to need --bucket", param_hint="--bucket"
+            )
+        objs = get_engine().timer_report(user=get_user(), days=days)
+        output(fmt=config.format, model=Report, objs=objs)
+        return
+
+    if start is not None:
+        since = parse_date(start, "--from")
+    elif days > 0:
+        today = ts.now().astimezone(config.timezone).date()
+        since = today - timedelta(days=days)
+    else:
+        since = None
+    objs = get_engine().timer_series(
+        user=get_user(),
+        bucket=bucket,
+        since=since,
+        until=None if end is None else parse_date(end, "--to"),
+    )
+    output(fmt=config.format, model=Total, objs=objs)
@@ -0,0 +1,101 @@
+"""Helpers shared by the command modules."""
+
+import textwrap
+from datetime import date, datetime
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import typer
+from tea import serde
+from tea import timestamp as ts
+
+from traktor.config import config
+
+
+def parse_timestamp(value: str, param_hint: str) -> datetime:
+    """Parse an ISO 8601 date or timestamp.
+
+    Timestamps without the timezone are in the configured timezone.
+
+    Args:
+        value (str): Date or timestamp, e.g. `2020-09-01` or
+            `2020-09-01T12:30`.
+        param_hint (str): Option name shown in the error message.
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise typer.BadParameter(
+            f"Invalid timestamp: {value}", param_hint=param_hint
+        )
+    if ts.is_naive(dt):
+        dt = ts.make_aware(dt, timezone=config.timezone)
+    return dt
+
+
+def parse_date(value: str, param_hint: str) -> date:
+    """Parse an ISO 8601 date or timestamp into a local day.
+
+    Timestamps are converted to the configured timezone first.
+
+    Args:
+        value (str): Date or timestamp, e.g. `2020-09-01`.
+        param_hint (str): Option name shown in the error message.
+    """
+    return (
+        parse_timestamp(value, param_hint).astimezone(config.timezone).date()
+    )
+
+
+def local_timestamp(dt: Optional[datetime]) -> str:
+    """Format the timestamp in the configured timezone."""
+    if dt is None:
+        return "None"
+    return dt.astimezone(config.timezone).strftime("%Y-%m-%d %H:%M:%S")
+
+
+# Column title, width and a function that returns the value
+StreamColumn = Tuple[str, int, Callable[[object], str]]
+
+
+def output_stream(name: str, columns: List[StreamColumn], objs: Iterable):
+    """Output objects one by one as they are produced.
+
+    Unlike `tea_console.console.output` this never holds all the objects in
+    memory. Text is written as fixed width columns, since a table has to see
+    all the rows to compute the widths. JSON is the same document that
+    `output` writes for a list.
+
+    Args:
+        name (str): Plural name of the objects for the empty message.
+        columns (list): Columns of the text output.
+        objs (iterable): Objects to output.
+    """
+    if config.format == config.Format.json:
+        first = True
+        for obj in objs:
+            typer.echo("[\n" if first else ",\n", nl=False)
+            typer.echo(
+                textwrap.indent(serde.json_dumps(obj), " " * 4), nl=False
+            )
+            first = False
+        typer.echo("[]" if first else "\n]")
+        return
+
+    def line(values) -> str:
+        return "  ".join(
+            value[:width].ljust(width)
+            for value, (_, width, _) in zip(values, columns)
+        ).rstrip()
+
+    first = True
+    for obj in objs:
+        if first:
+            typer.secho(
+                line([title for title, _, _ in columns]),
+                bold=True,
+                fg="magenta",
+            )
+            first = False
+        typer.echo(line([str(path(obj)) for _, _, path in columns]))
+    if first:
+        typer.secho(f"No {name} found.", fg="cyan")
@@ -3,6 +3,18 @@ from typing import Optional
 
 from tea_django.config import ConfigField, Config as TeaConfig
 
+from traktor.enums import JournalMode, Synchronous, TempStore
+
+
+def enum_field(section: str, option: str, enum_type) -> ConfigField:
+    """Enum configuration field that can be set to null."""
+    return ConfigField(
+        section=section,
+        option=option,
+        to_value=lambda v: None if v is None else enum_type(v.lower()),
+        to_string=lambda v: None if v is None else v.value,
+    )
+
 
 class Config(TeaConfig):
     ENTRIES = {
@@ -13,6 +25,25 @@ class Config(TeaConfig):
         "db_password": ConfigField(section="database", option="password"),
         "db_host": ConfigField(section="database", option="host"),
         "db_port": ConfigField(section="database", option="port", type=int),
+        # SQLite connection pragmas, null keeps the SQLite default
+        "db_journal_mode": enum_field(
+            section="database", option="journal_mode", enum_type=JournalMode
+        ),
+        "db_synchronous": enum_field(
+            section="database", option="synchronous", enum_type=Synchronous
+        ),
+        "db_mmap_size": ConfigField(
+            section="database", option="mmap_size", type=int
+        ),
+        "db_cache_size": ConfigField(
+            section="database", option="cache_size", type=int
+        ),
+        "db_busy_timeout": ConfigField(
+            section="database", option="busy_timeout", type=int
+        ),
+        "db_temp_store": enum_field(
+            section="database", option="temp_store", enum_type=TempStore
+        ),
     }
 
     def __init__(self, config_file: Optional[str] = None):
@@ -29,6 +60,19 @@ class Config(TeaConfig):
         self.db_password = None
         self.db_host = None
         self.db_port = None
+        # Defaults for a single user on a laptop. Write ahead log lets the
+        # readers (status bar, shell hooks) work while a command writes, and
+        # with `synchronous = normal` a commit doesn't wait for fsync. A power
+        # loss can lose the last commits, but never corrupts the database.
+        self.db_journal_mode = JournalMode.wal
+        self.db_synchronous = Synchronous.normal
+        # Memory map up to 64 MiB of the database file
+        self.db_mmap_size = 64 * 1024 * 1024
+        # Negative value is in KiB, so 16 MiB of page cache per connection
+        self.db_cache_size = -16 * 1024
+        # Wait up to 5 seconds for a lock instead of failing immediately
+        self.db_busy_timeout = 5000
+        self.db_temp_store = TempStore.memory
 
         super().__init__(
             config_file=config_file or (self.config_dir / "traktor.ini")
@@ -0,0 +1,243 @@
+"""Traktor daemon.
+
+Daemon keeps Django set up and the engine loaded, and listens on a Unix
+domain socket. When it's running, timer commands are forwarded to it instead
+of being executed in a new process, which skips the whole startup cost.
+
+Protocol is a single JSON line request `{"args": [...], "isatty": bool,
+"env": {...}}` answered with a single JSON line response `{"exit_code": int,
+"stdout": str, "stderr": str}`.
+"""
+
+import io
+import os
+import sys
+import json
+import socket
+import shutil
+import signal
+import traceback
+import socketserver
+from pathlib import Path
+from typing import List, Optional
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+
+# Commands that are forwarded to the daemon
+FORWARDED = frozenset(("start", "stop", "status", "today", "report"))
+# Global options that take a value
+GLOBAL_OPTIONS = frozenset(("--format", "--user"))
+# Arguments that are never forwarded
+LOCAL_ONLY = frozenset(
+    (
+        "--help",
+        "--config-path",
+        "-i",
+        "--interactive",
+        "--profile",
+        "--profile-stats",
+    )
+)
+# Seconds to wait for the daemon to accept the request before executing the
+# command locally. The answer is awaited without a timeout, since the daemon
+# may already have executed the command.
+TIMEOUT = 10.0
+# Environment variables that are never forwarded
+LOCAL_ONLY_ENV = ("TRAKTOR_PROFILE", "TRAKTOR_PROFILE_STATS")
+# Environment variables that affect the output rendering
+OUTPUT_ENV = ("COLUMNS", "LINES", "TERM", "COLORTERM", "NO_COLOR")
+
+
+def socket_path() -> Path:
+    # Same as `config.config_dir`, without the cost of loading the config.
+    return (Path("~").expanduser() / ".traktor").absolute() / "traktor.sock"
+
+
+def _command_name(args: List[str]) -> Optional[str]:
+    """Find the command name skipping the global options."""
+    args = iter(args)
+    for arg in args:
+        if arg in GLOBAL_OPTIONS:
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return None
+
+
+def _is_local_only(arg: str) -> bool:
+    """Match the local only options also with the `--option=value` form."""
+    return arg.split("=", 1)[0] in LOCAL_ONLY
+
+
+def forward(args: List[str]) -> Optional[int]:
+    """Execute the command in the daemon if it's running.
+
+    The command is executed locally only if the request couldn't be sent.
+    Once it's sent the daemon may execute it, so running it again could
+    start or stop the timer twice. A missing or invalid answer is reported
+    as an error instead.
+
+    Returns:
+        Exit code of the command or None if the command was not forwarded
+        and should be executed in this process.
+    """
+    if (
+        any(_is_local_only(arg) for arg in args)
+        or any(os.environ.get(key) for key in LOCAL_ONLY_ENV)
+        or _command_name(args) not in FORWARDED
+    ):
+        return None
+
+    env = {key: os.environ[key] for key in OUTPUT_ENV if key in os.environ}
+    if sys.stdout.isatty():
+        env.setdefault("COLUMNS", str(shutil.get_terminal_size().columns))
+    request = {"args": args, "isatty": sys.stdout.isatty(), "env": env}
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(TIMEOUT)
+        try:
+            sock.connect(str(socket_path()))
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        except OSError:
+            # Daemon is not running or didn't accept the request. A partial
+            # request is not a valid JSON line, so it's never executed.
+            return None
+
+        sock.settimeout(None)
+        try:
+            with sock.makefile("rb") as f:
+                response = json.loads(f.readline())
+            stdout, stderr = response["stdout"], response["stderr"]
+            exit_code = response["exit_code"]
+        except (OSError, ValueError, KeyError, TypeError):
+            # Closed without an answer or answered garbage
+            sys.stderr.write(
+                "Daemon didn't answer, the command may have been executed. "
+                "Check the timer with `traktor status`.\n"
+            )
+            return 1
+
+    sys.stdout.write(stdout)
+    sys.stderr.write(stderr)
+    return exit_code
+
+
+class _Output(io.StringIO):
+    """Captured output that reports the client's terminal status."""
+
+    def __init__(self, isatty: bool):
+        super().__init__()
+        self._isatty = isatty
+
+    def isatty(self) -> bool:
+        return self._isatty
+
+
+@contextmanager
+def _environ(env: dict):
+    old = {key: os.environ.get(key) for key in OUTPUT_ENV}
+    for key in OUTPUT_ENV:
+        os.environ.pop(key, None)
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for key, value in old.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+# Database version seen by the previous command
+_data_version = None
+
+
+def _clear_caches():
+    """Clear the caches if the database was changed by another process."""
+    global _data_version
+    from traktor.engine import engine
+    from traktor.engine.slug_cache import slug_cache
+
+    version = engine.db.data_version()
+    if version is None or version != _data_version:
+        slug_cache.clear()
+    _data_version = version
+
+
+def execute(request: dict) -> dict:
+    """Execute the forwarded command and capture its output."""
+    import click
+    from traktor.config import config
+    from traktor.commands import app
+
+    # Reset the state left by the previous command
+    config.set_user(None)
+    _clear_caches()
+
+    stdout = _Output(isatty=request["isatty"])
+    stderr = _Output(isatty=request["isatty"])
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        with _environ(request["env"]):
+            try:
+                result = app(
+                    args=request["args"],
+                    prog_name="traktor",
+                    standalone_mode=False,
+                )
+                exit_code = result if isinstance(result, int) else 0
+            except click.ClickException as e:
+                e.show()
+                exit_code = e.exit_code
+            except click.Abort:
+                exit_code = 1
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+
+    return {
+        "exit_code": exit_code,
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+    }
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        response = execute(request)
+        self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+
+def serve():
+    """Run the daemon until it's interrupted."""
+    from traktor import errors
+    from traktor.commands.lazy import get_engine
+
+    # Warm up: set up Django, load the engine and open the database.
+    get_engine().db.ensure()
+
+    path = socket_path()
+    if path.exists():
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(path))
+            raise errors.DaemonAlreadyRunning(path=str(path))
+        except OSError:
+            # Stale socket left by a daemon that was killed
+            path.unlink()
+        finally:
+            sock.close()
+
+    # Exit cleanly and remove the socket when terminated
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    os.makedirs(path.parent, exist_ok=True)
+    with socketserver.UnixStreamServer(str(path), RequestHandler) as server:
+        os.chmod(path, 0o600)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink()
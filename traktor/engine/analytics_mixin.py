@@ -0,0 +1,190 @@
+import uuid
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tea import timestamp as ts
+
+from traktor.config import config
+from traktor.enums import Bucket, GroupBy
+from traktor.models import User, Project, Task, Total, Percentile
+from traktor.models.daily_total import bucket_start, day_start, next_bucket
+from traktor.engine.entry_cache import EntryCache, from_micros, to_micros
+from traktor.engine.entry_mixin import EntryMixin
+
+
+def bucket_bounds(
+    bucket: Bucket, start: datetime, end: datetime
+) -> List[date]:
+    """Return the first days of the buckets that cover the time range.
+
+    The last day starts the bucket after the range.
+    """
+    day = bucket_start(bucket, start.astimezone(config.timezone).date())
+    days = [day]
+    while day_start(day) < end:
+        day = next_bucket(bucket, day)
+        days.append(day)
+    return days
+
+
+class AnalyticsMixin(EntryMixin):
+    @staticmethod
+    def entry_cache(user: User) -> EntryCache:
+        """Return the user's columnar entry cache refreshed from the database.
+
+        Columns can be used directly, e.g. for analysis in NumPy or pandas.
+        """
+        cache = EntryCache(user=user)
+        cache.refresh()
+        return cache
+
+    @staticmethod
+    def _window(
+        cache: EntryCache,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        now: int,
+    ) -> Optional[Tuple[int, int]]:
+        """Return the window in microseconds, all entries by default."""
+        span = cache.span(now=now)
+        if span is None:
+            return None
+        lo = span[0] if start is None else to_micros(start)
+        hi = span[1] if end is None else to_micros(end)
+        return (lo, hi) if lo < hi else None
+
+    @staticmethod
+    def _group_names(
+        cache: EntryCache, group_by: Optional[GroupBy]
+    ) -> Dict[int, Tuple[str, str]]:
+        """Return the project and task names by the group index."""
+        if group_by is None:
+            return {0: ("", "")}
+        if group_by == GroupBy.project:
+            names = {
+                project.id.hex: (project.name, "")
+                for project in Project.objects.filter(
+                    pk__in=[uuid.UUID(pk) for pk in cache.projects]
+                )
+            }
+            ids = cache.projects
+        else:
+            names = {
+                task.id.hex: (task.project.name, task.name)
+                for task in Task.objects.filter(
+                    pk__in=[uuid.UUID(pk) for pk in cache.tasks]
+                )
+            }
+            ids = cache.tasks
+        return {i: names.get(pk, ("", "")) for i, pk in enumerate(ids)}
+
+    @classmethod
+    def entry_totals(
+        cls,
+        user: User,
+        bucket: Optional[Bucket] = None,
+        group_by: Optional[GroupBy] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Total]:
+        """Aggregate the time spent per period, project or task.
+
+        Computed from the columnar entry cache, so the cost is a pass over
+        the cached columns and not a query over the entries. Entries are
+        clipped to the range and split at the period bounds in the
+        configured timezone.
+
+        Args:
+            user (User): User whose time is aggregated.
+            bucket (Bucket, optional): Aggregate per day, week or month.
+            group_by (GroupBy, optional): Aggregate per project or task.
+            start (datetime, optional): Start of the range, all entries if
+                not set.
+            end (datetime, optional): End of the range, exclusive.
+        """
+        cache = cls.entry_cache(user=user)
+        now = to_micros(ts.now())
+        window = cls._window(cache, start=start, end=end, now=now)
+        if window is None:
+            return []
+        lo, hi = window
+
+        days, bounds = [None], None
+        if bucket is not None:
+            days = bucket_bounds(
+                bucket, start=from_micros(lo), end=from_micros(hi)
+            )
+            bounds = [to_micros(day_start(day)) for day in days]
+
+        names = cls._group_names(cache, group_by=group_by)
+        totals = cache.totals(
+            lo=lo,
+            hi=hi,
+            now=now,
+            bounds=bounds,
+            group=None if group_by is None else group_by.value,
+        )
+        return sorted(
+            (
+                Total(
+                    period=days[k],
+                    project=names[g][0],
+                    task=names[g][1],
+                    duration=micros // 1_000_000,
+                )
+                for (k, g), micros in totals.items()
+            ),
+            key=lambda t: (t.period or date.min, t.project, t.task),
+        )
+
+    @classmethod
+    def entry_percentiles(
+        cls,
+        user: User,
+        percentiles: Sequence[float] = (50, 90, 99),
+        group_by: Optional[GroupBy] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> List[Percentile]:
+        """Compute percentiles of the entry durations.
+
+        Computed from the columnar entry cache like `entry_totals`.
+        Durations of the entries that cross the range bounds are clipped.
+
+        Args:
+            user (User): User whose entries are used.
+            percentiles (list): Percentiles between 0 and 100.
+            group_by (GroupBy, optional): Percentiles per project or task.
+            start (datetime, optional): Start of the range, all entries if
+                not set.
+            end (datetime, optional): End of the range, exclusive.
+        """
+        cache = cls.entry_cache(user=user)
+        now = to_micros(ts.now())
+        window = cls._window(cache, start=start, end=end, now=now)
+        if window is None:
+            return []
+        lo, hi = window
+
+        names = cls._group_names(cache, group_by=group_by)
+        result = cache.percentiles(
+            lo=lo,
+            hi=hi,
+            now=now,
+            percentiles=percentiles,
+            group=None if group_by is None else group_by.value,
+        )
+        return sorted(
+            (
+                Percentile(
+                    project=names[g][0],
+                    task=names[g][1],
+                    count=count,
+                    percentile=p,
+                    duration=micros // 1_000_000,
+                )
+                for g, (count, values) in result.items()
+                for p, micros in zip(percentiles, values)
+            ),
+            key=lambda p: (p.project, p.task, p.percentile),
+        )
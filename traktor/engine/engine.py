@@ -1,8 +1,8 @@
 from traktor.engine.db_engine import DBEngine
-from traktor.engine.timer_mixin import TimerMixin
+from traktor.engine.analytics_mixin import AnalyticsMixin
 
 
-class Engine(TimerMixin):
+class Engine(AnalyticsMixin):
     db = DBEngine()
 
 
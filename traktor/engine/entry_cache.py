@@ -0,0 +1,533 @@
+"""Columnar on-disk cache of the entries for analytics.
+
+Every user's entries are kept in `<config_dir>/cache/entries-<user id>` as
+four fixed width columns: start and end time in microseconds since the epoch
+(`int64`, running entries end at `RUNNING`) and task and project indexes
+(`int32`) into the lists stored in `meta.json`. Columns are memory mapped
+when read, as NumPy arrays if NumPy is installed and as memory views
+otherwise.
+
+The cache is refreshed incrementally: entries updated since the last
+refresh (`Entry.updated_on`) are overwritten in place or appended. Deleted
+entries can't be found that way, so deleting an entry or a task invalidates
+the caches and they're rebuilt by the next refresh. So do bulk imports and
+restores, since they keep the old `updated_on`. Archived entries are cached
+too, and archiving keeps their ids and times, so it doesn't invalidate.
+
+Refreshes hold an exclusive lock on `entries-<user id>.lock`, and rows are
+written at the row count from the metadata, so an interrupted refresh
+leaves only unreferenced bytes that the next one overwrites.
+"""
+
+import os
+import json
+import mmap
+import array
+import bisect
+import shutil
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from contextlib import ExitStack, contextmanager
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from tea import timestamp as ts
+from traktor.config import config
+from django.dispatch import receiver
+from django.db.models.signals import post_delete
+
+from traktor.models import User, Task, Entry, ArchivedEntry
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# End of the running entries
+RUNNING = -1
+
+
+def to_micros(dt: datetime) -> int:
+    """Convert the timestamp to microseconds since the epoch."""
+    delta = dt - EPOCH
+    return (
+        delta.days * 86400 + delta.seconds
+    ) * 1_000_000 + delta.microseconds
+
+
+def from_micros(micros: int) -> datetime:
+    """Convert microseconds since the epoch to the timestamp."""
+    return EPOCH + timedelta(microseconds=micros)
+
+
+class Columns(NamedTuple):
+    """Cached columns, NumPy arrays or memory views of the same length."""
+
+    start: Iterable[int]
+    end: Iterable[int]
+    task: Iterable[int]
+    project: Iterable[int]
+
+
+class EntryCache:
+    # Column name and `array` type code
+    COLUMNS = {"start": "q", "end": "q", "task": "i", "project": "i"}
+    VERSION = 1
+
+    def __init__(self, user: User, path: Optional[Path] = None):
+        self.user = user
+        self.path = path or self.root() / f"entries-{user.pk}"
+        self.meta = self._read_meta()
+
+    @staticmethod
+    def root() -> Path:
+        return config.config_dir / "cache"
+
+    @classmethod
+    def invalidate_all(cls):
+        """Make the caches of all users rebuild on the next refresh.
+
+        Only the metadata is removed, so the processes that have the
+        columns mapped can keep reading them.
+        """
+        for path in cls.root().glob("entries-*/meta.json"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _db_key() -> str:
+        return f"{config.db_engine}:{config.db_host}:{config.db_name}"
+
+    @property
+    def rows(self) -> int:
+        return 0 if self.meta is None else self.meta["rows"]
+
+    @property
+    def tasks(self) -> List[str]:
+        """Task ids by their index in the task column."""
+        return [] if self.meta is None else self.meta["tasks"]
+
+    @property
+    def projects(self) -> List[str]:
+        """Project ids by their index in the project column."""
+        return [] if self.meta is None else self.meta["projects"]
+
+    def _read_meta(self) -> Optional[dict]:
+        try:
+            meta = json.loads((self.path / "meta.json").read_text("utf-8"))
+        except (OSError, ValueError):
+            return None
+        if meta.get("version") != self.VERSION or meta.get("db") != (
+            self._db_key()
+        ):
+            return None
+        return meta
+
+    def _write_meta(self, meta: dict):
+        # Written last and replaced atomically, readers never see rows that
+        # are not fully written
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, self.path / "meta.json")
+        self.meta = meta
+
+    def _entries(self) -> Iterator[tuple]:
+        """Iterate over the rows of the user's entries, archived included."""
+        for model in (Entry, ArchivedEntry):
+            yield from (
+                model.objects.select_related(None)
+                .filter(task__project__user=self.user)
+                .order_by()
+                .values_list(
+                    "id",
+                    "start_time",
+                    "end_time",
+                    "task_id",
+                    "task__project_id",
+                )
+                .iterator(chunk_size=10_000)
+            )
+
+    @contextmanager
+    def _lock(self):
+        """Hold the exclusive lock on the cache files.
+
+        The lock file is next to the cache directory, which is removed by
+        the rebuild. Without `fcntl` the cache is not locked.
+        """
+        if fcntl is None:
+            yield
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.with_name(f"{self.path.name}.lock").open("wb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Bring the cache up to date with the database.
+
+        Costs one query on the `updated_on` index when nothing changed.
+        """
+        with self._lock():
+            # Another process could have refreshed while this one waited
+            self.meta = self._read_meta()
+            if self.meta is None:
+                self._rebuild()
+            else:
+                self._refresh()
+
+    def rebuild(self):
+        """Write the whole cache from scratch."""
+        with self._lock():
+            self._rebuild()
+
+    def _refresh(self):
+        # Take the watermark before reading, so that the entries updated
+        # during the refresh are read again by the next one
+        until = ts.now()
+        since = ts.from_utc_str(self.meta["watermark"])
+        # Filtered only by `updated_on`, so that the query uses its index
+        # instead of scanning all the user's entries. The few changed entries
+        # of the other users are skipped here.
+        changed = [
+            row[:-1]
+            for row in Entry.objects.select_related(None)
+            .filter(updated_on__gte=since)
+            .values_list(
+                "id",
+                "start_time",
+                "end_time",
+                "task_id",
+                "task__project_id",
+                "task__project__user_id",
+            )
+            if row[-1] == self.user.pk
+        ]
+        meta = dict(self.meta, watermark=ts.to_utc_str(until))
+        if len(changed) > 0:
+            self._apply(changed, meta)
+        self._write_meta(meta)
+
+    def _rebuild(self):
+        until = ts.now()
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.path.mkdir(parents=True)
+        meta = {
+            "version": self.VERSION,
+            "db": self._db_key(),
+            "watermark": ts.to_utc_str(until),
+            "rows": 0,
+            "tasks": [],
+            "projects": [],
+        }
+        batch = []
+        for row in self._entries():
+            batch.append(row)
+            if len(batch) == 10_000:
+                self._apply(batch, meta, append_only=True)
+                batch = []
+        self._apply(batch, meta, append_only=True)
+        self._write_meta(meta)
+
+    def _apply(self, rows: list, meta: dict, append_only: bool = False):
+        """Overwrite the changed rows and append the new ones."""
+        task_index = {task: i for i, task in enumerate(meta["tasks"])}
+        project_index = {
+            project: i for i, project in enumerate(meta["projects"])
+        }
+
+        def index(mapping: Dict[str, int], ids: list, key) -> int:
+            key = key.hex
+            if key not in mapping:
+                mapping[key] = len(ids)
+                ids.append(key)
+            return mapping[key]
+
+        positions = {} if append_only else self._positions(rows, meta["rows"])
+        appended = {
+            name: array.array(code) for name, code in self.COLUMNS.items()
+        }
+        ids = bytearray()
+        updates = []
+        for entry_id, start, end, task_id, project_id in rows:
+            values = {
+                "start": to_micros(start),
+                "end": RUNNING if end is None else to_micros(end),
+                "task": index(task_index, meta["tasks"], task_id),
+                "project": index(project_index, meta["projects"], project_id),
+            }
+            position = positions.get(entry_id.bytes)
+            if position is None:
+                for name, value in values.items():
+                    appended[name].append(value)
+                ids += entry_id.bytes
+            else:
+                updates.append((position, values))
+
+        for name, code in self.COLUMNS.items():
+            itemsize = array.array(code).itemsize
+            with self._open(name, size=meta["rows"] * itemsize) as f:
+                for position, values in updates:
+                    f.seek(position * itemsize)
+                    f.write(array.array(code, [values[name]]).tobytes())
+                f.seek(meta["rows"] * itemsize)
+                f.write(appended[name].tobytes())
+        with self._open("ids", size=meta["rows"] * 16) as f:
+            f.seek(meta["rows"] * 16)
+            f.write(ids)
+        meta["rows"] += len(ids) // 16
+
+    def _open(self, name: str, size: int):
+        """Open the column for writing cut to the size of the cached rows.
+
+        Rows past the count are left by an interrupted refresh and are
+        overwritten.
+        """
+        path = self.path / name
+        path.touch()
+        f = path.open("r+b")
+        f.truncate(size)
+        return f
+
+    def _positions(self, rows: list, count: int) -> Dict[bytes, int]:
+        """Find the cached rows of the entries.
+
+        Changed entries are usually the latest ones, so the end of the ids
+        is searched first and all of them only if something is missing.
+        """
+        wanted = {row[0].bytes for row in rows}
+        positions = {}
+        with (self.path / "ids").open("rb") as f:
+            for first in (max(count - 1024, 0), 0):
+                f.seek(first * 16)
+                data = f.read((count - first) * 16)
+                for i in range(0, len(data), 16):
+                    if data[i : i + 16] in wanted:
+                        positions[data[i : i + 16]] = first + i // 16
+                if len(positions) == len(wanted) or first == 0:
+                    return positions
+        return positions
+
+    @contextmanager
+    def columns(self) -> Iterator[Columns]:
+        """Memory map the columns.
+
+        Views are valid only inside the context, copy what has to outlive
+        it.
+        """
+        with ExitStack() as stack:
+            views = {}
+            for name, code in self.COLUMNS.items():
+                if self.rows == 0:
+                    views[name] = (
+                        numpy.zeros(0, dtype=code)
+                        if numpy is not None
+                        else memoryview(array.array(code))
+                    )
+                    continue
+                f = stack.enter_context((self.path / name).open("rb"))
+                length = self.rows * array.array(code).itemsize
+                mm = mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ)
+                stack.callback(self._close, mm)
+                if numpy is not None:
+                    views[name] = numpy.frombuffer(
+                        mm, dtype=code, count=self.rows
+                    )
+                else:
+                    view = memoryview(mm).cast(code)
+                    stack.callback(self._close, view)
+                    views[name] = view
+            yield Columns(**views)
+            views.clear()
+
+    @staticmethod
+    def _close(obj):
+        try:
+            obj.release() if isinstance(obj, memoryview) else obj.close()
+        except BufferError:
+            # Something still references the map, it's closed when freed
+            pass
+
+    # Aggregations, times are in microseconds since the epoch
+
+    def span(self, now: int) -> Optional[Tuple[int, int]]:
+        """Return the first start and the last end of the entries."""
+        if self.rows == 0:
+            return None
+        with self.columns() as c:
+            if numpy is not None:
+                end = int(numpy.where(c.end == RUNNING, now, c.end).max())
+                return int(c.start.min()), end
+            return (
+                min(c.start),
+                max(now if e == RUNNING else e for e in c.end),
+            )
+
+    def _clipped(self, c: Columns, group: Optional[str], lo, hi, now):
+        """Clip the entries to the window and drop the ones outside it.
+
+        Returns NumPy arrays of the starts, ends and group indexes.
+        """
+        start = numpy.maximum(c.start, lo)
+        end = numpy.minimum(numpy.where(c.end == RUNNING, now, c.end), hi)
+        keep = end > start
+        groups = (
+            numpy.zeros(len(start), dtype="i")
+            if group is None
+            else getattr(c, group)
+        )
+        return start[keep], end[keep], groups[keep]
+
+    def _iter_clipped(self, c: Columns, group: Optional[str], lo, hi, now):
+        """Pure Python `_clipped` that yields `(start, end, group)`."""
+        groups = getattr(c, group) if group is not None else None
+        for i, (start, end) in enumerate(zip(c.start, c.end)):
+            start = max(start, lo)
+            end = min(now if end == RUNNING else end, hi)
+            if end > start:
+                yield start, end, 0 if groups is None else groups[i]
+
+    def totals(
+        self,
+        lo: int,
+        hi: int,
+        now: int,
+        bounds: Optional[List[int]] = None,
+        group: Optional[str] = None,
+    ) -> Dict[Tuple[int, int], int]:
+        """Sum the time spent in the window per bucket and group.
+
+        Entries are clipped to the window `[lo, hi)` and split at the bucket
+        bounds, so an entry that crosses a bound counts in both buckets.
+
+        Args:
+            lo (int): Start of the window.
+            hi (int): End of the window.
+            now (int): End of the running entries.
+            bounds (list, optional): Sorted bucket bounds covering the
+                window. Bucket `i` is `[bounds[i], bounds[i + 1])`. If not
+                set, there is a single bucket.
+            group (str, optional): Group by the `task` or `project` column.
+
+        Returns:
+            dict: Microseconds by `(bucket index, group index)`.
+        """
+        result = {}
+        with self.columns() as c:
+            if numpy is None:
+                for start, end, g in self._iter_clipped(c, group, lo, hi, now):
+                    if bounds is None:
+                        result[0, g] = result.get((0, g), 0) + end - start
+                        continue
+                    k = bisect.bisect_right(bounds, start) - 1
+                    while start < end:
+                        piece = min(end, bounds[k + 1])
+                        result[k, g] = result.get((k, g), 0) + piece - start
+                        start, k = piece, k + 1
+                return result
+
+            start, end, groups = self._clipped(c, group, lo, hi, now)
+        n_groups = int(groups.max()) + 1 if len(groups) > 0 else 1
+        if bounds is None:
+            first = last = numpy.zeros(len(start), dtype="q")
+        else:
+            b = numpy.asarray(bounds, dtype="q")
+            first = numpy.searchsorted(b, start, side="right") - 1
+            last = numpy.searchsorted(b, end - 1, side="right") - 1
+
+        # Most entries fall into a single bucket, they're summed at once
+        same = first == last
+        keys = first[same] * n_groups + groups[same]
+        sums = numpy.bincount(keys, weights=(end - start)[same])
+        keys = numpy.nonzero(sums)[0]
+        result = dict(
+            zip(
+                zip((keys // n_groups).tolist(), (keys % n_groups).tolist()),
+                sums[keys].astype("q").tolist(),
+            )
+        )
+        for i in numpy.nonzero(~same)[0]:
+            s, e, g = int(start[i]), int(end[i]), int(groups[i])
+            for k in range(int(first[i]), int(last[i]) + 1):
+                piece = min(e, bounds[k + 1]) - max(s, bounds[k])
+                result[k, g] = result.get((k, g), 0) + piece
+        return result
+
+    def percentiles(
+        self,
+        lo: int,
+        hi: int,
+        now: int,
+        percentiles: Sequence[float],
+        group: Optional[str] = None,
+    ) -> Dict[int, Tuple[int, List[int]]]:
+        """Compute percentiles of the entry durations in the window.
+
+        Durations are clipped to the window. Percentiles are linearly
+        interpolated like `numpy.percentile` does by default.
+
+        Returns:
+            dict: Number of entries and the percentiles in microseconds by
+                group index.
+        """
+        result = {}
+        with self.columns() as c:
+            if numpy is None:
+                durations = {}
+                for start, end, g in self._iter_clipped(c, group, lo, hi, now):
+                    durations.setdefault(g, []).append(end - start)
+                for g, values in durations.items():
+                    values.sort()
+                    result[g] = (
+                        len(values),
+                        [_interpolate(values, p) for p in percentiles],
+                    )
+                return result
+
+            start, end, groups = self._clipped(c, group, lo, hi, now)
+        durations = end - start
+        order = numpy.argsort(groups, kind="stable")
+        groups, durations = groups[order], durations[order]
+        unique, first = numpy.unique(groups, return_index=True)
+        for g, values in zip(unique, numpy.split(durations, first[1:])):
+            result[int(g)] = (
+                len(values),
+                [int(v) for v in numpy.percentile(values, percentiles)],
+            )
+        return result
+
+
+def _interpolate(values: List[int], percentile: float) -> int:
+    """Linearly interpolated percentile of sorted values."""
+    k = (len(values) - 1) * percentile / 100
+    i = int(k)
+    if i + 1 >= len(values):
+        return values[-1]
+    return int(values[i] + (values[i + 1] - values[i]) * (k - i))
+
+
+@receiver(post_delete, sender=Entry)
+@receiver(post_delete, sender=Task)
+def invalidate_entry_cache(sender, **kwargs):
+    EntryCache.invalidate_all()
@@ -0,0 +1,231 @@
+import uuid
+import heapq
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from django.db import OperationalError, connection
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+from traktor import errors
+from traktor.models import (
+    User,
+    Task,
+    Entry,
+    ArchivedEntry,
+    EntrySearch,
+    Hit,
+)
+from traktor.engine.timer_mixin import TimerMixin
+
+
+class EntryMixin(TimerMixin):
+    @staticmethod
+    def _pages(query, page_size: int) -> Iterator:
+        """Iterate over the query ordered by `(start_time, id)` in pages.
+
+        Pages after the first start with a row value comparison, so every
+        page is a range scan of the `(start_time, id)` index that reads the
+        rows in order and stops after a page, and no page is sorted.
+        """
+        model = query.model
+        qn = connection.ops.quote_name
+        table = qn(model._meta.db_table)
+        after = f"({table}.{qn('start_time')}, {table}.{qn('id')}) > (%s, %s)"
+        query = query.order_by("start_time", "id")
+        last = None
+        while True:
+            page = query
+            if last is not None:
+                params = [
+                    connection.ops.adapt_datetimefield_value(last.start_time),
+                    model._meta.pk.get_db_prep_value(last.id, connection),
+                ]
+                page = page.filter(
+                    RawSQL(after, params, output_field=BooleanField())
+                )
+            count = 0
+            for last in page[:page_size].iterator(chunk_size=page_size):
+                count += 1
+                yield last
+            if count < page_size:
+                return
+
+    @staticmethod
+    def _in_tasks(model, task_ids: list):
+        """Filter the rows of the tasks without the per task indexes.
+
+        Per task index would read all the remaining rows of the tasks and
+        sort them for every page. SQLite doesn't search an index by a column
+        with the unary plus, so it reads the `(start_time, id)` index in
+        order and filters the tasks on the way. Other databases choose the
+        index by their statistics.
+        """
+        if connection.vendor != "sqlite" or len(task_ids) == 0:
+            return Q(task_id__in=task_ids)
+        qn = connection.ops.quote_name
+        column = f"{qn(model._meta.db_table)}.{qn('task_id')}"
+        placeholders = ", ".join(["%s"] * len(task_ids))
+        field = model._meta.get_field("task")
+        return RawSQL(
+            f"+{column} IN ({placeholders})",
+            [field.get_db_prep_value(pk, connection) for pk in task_ids],
+            output_field=BooleanField(),
+        )
+
+    @classmethod
+    def entry_list(
+        cls,
+        user: User,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        project_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        page_size: int = 500,
+    ) -> Iterator[Entry]:
+        """Iterate over entries ordered by start time.
+
+        Entries are fetched in pages with keyset pagination on
+        `(start_time, id)`, so every page is an index range scan no matter
+        how deep into the history it is, and only one page is in memory.
+        Archived entries are read only if the range starts before the end
+        of the archive, and merged with the entries in order.
+
+        Args:
+            user (User): Selected user.
+            start (datetime, optional): Only entries started at or after.
+            end (datetime, optional): Only entries started before.
+            project_id (str, optional): Project slug.
+            task_id (str, optional): Task slug.
+            page_size (int): Number of entries fetched at once.
+        """
+        models = [Entry]
+        until = ArchivedEntry.archived_until()
+        if until is not None and (start is None or start < until):
+            models.append(ArchivedEntry)
+
+        # User, project and task filters select the tasks once, so the pages
+        # are read from the `(start_time, id)` index without joins
+        tasks = Task.objects.filter(project__user=user)
+        if project_id is not None:
+            tasks = tasks.filter(project__slug=project_id)
+        if task_id is not None:
+            tasks = tasks.filter(slug=task_id)
+        task_ids = list(tasks.values_list("id", flat=True))
+
+        queries = []
+        for model in models:
+            query = model.objects.filter(cls._in_tasks(model, task_ids))
+            if start is not None:
+                query = query.filter(start_time__gte=start)
+            if end is not None:
+                query = query.filter(start_time__lt=end)
+            queries.append(cls._pages(query, page_size=page_size))
+
+        if len(queries) == 1:
+            yield from queries[0]
+        else:
+            yield from heapq.merge(
+                *queries, key=lambda entry: (entry.start_time, entry.id)
+            )
+
+    @staticmethod
+    def _fallback_search(
+        user: User,
+        query: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        project_id: Optional[str],
+        task_id: Optional[str],
+        limit: int,
+        archived: bool,
+    ) -> List[Tuple[str, float, str]]:
+        """Substring search for databases without the full-text index."""
+        models = [Entry, ArchivedEntry] if archived else [Entry]
+        found = []
+        for model in models:
+            entries = model.objects.filter(
+                Q(description__icontains=query) | Q(notes__icontains=query),
+                task__project__user=user,
+            )
+            if start is not None:
+                entries = entries.filter(start_time__gte=start)
+            if end is not None:
+                entries = entries.filter(start_time__lt=end)
+            if project_id is not None:
+                entries = entries.filter(task__project__slug=project_id)
+            if task_id is not None:
+                entries = entries.filter(task__slug=task_id)
+            found.extend(entries.order_by("-start_time")[:limit])
+        found.sort(key=lambda entry: entry.start_time, reverse=True)
+        return [
+            (entry.id.hex, 0.0, entry.description or entry.notes)
+            for entry in found[:limit]
+        ]
+
+    @classmethod
+    def entry_search(
+        cls,
+        user: User,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        project_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Hit]:
+        """Find entries by their description and notes, best matches first.
+
+        On SQLite the query is an FTS5 query, e.g. `deploy AND prod*`, run
+        against the full-text index and ranked by BM25. Other databases fall
+        back to a substring search ordered by start time. Archived entries
+        are searched only if the range starts before the end of the archive.
+
+        Args:
+            user (User): Selected user.
+            query (str): Search query.
+            start (datetime, optional): Only entries started at or after.
+            end (datetime, optional): Only entries started before.
+            project_id (str, optional): Project slug.
+            task_id (str, optional): Task slug.
+            limit (int): Maximal number of matches.
+        """
+        until = ArchivedEntry.archived_until()
+        kwargs = dict(
+            start=start,
+            end=end,
+            project_id=project_id,
+            task_id=task_id,
+            limit=limit,
+            archived=until is not None and (start is None or start < until),
+        )
+        if EntrySearch.is_available():
+            try:
+                rows = EntrySearch.match(
+                    user_id=user.pk, query=query, **kwargs
+                )
+            except OperationalError as e:
+                raise errors.InvalidSearchQuery(query=query, reason=str(e))
+        else:
+            rows = cls._fallback_search(user=user, query=query, **kwargs)
+
+        pks = [uuid.UUID(pk) for pk, _, _ in rows]
+        entries = Entry.objects.in_bulk(pks)
+        if kwargs["archived"]:
+            entries.update(ArchivedEntry.objects.in_bulk(pks))
+        hits = []
+        for pk, rank, snippet in rows:
+            entry = entries[uuid.UUID(pk)]
+            hits.append(
+                Hit(
+                    id=entry.id.hex,
+                    project=entry.task.project.name,
+                    task=entry.task.name,
+                    start_time=entry.start_time,
+                    end_time=entry.end_time,
+                    duration=entry.running_duration,
+                    snippet=snippet,
+                    rank=rank,
+                )
+            )
+        return hits
@@ -0,0 +1,101 @@
+import json
+from typing import Any, Iterator, TextIO, Tuple
+
+
+class ExportReader:
+    """Incremental reader for the JSON export documents.
+
+    Export document is a JSON object where every key holds an array of
+    records, e.g. `{"projects": [...], "tasks": [...], "entries": [...]}`.
+    The reader parses the document from the file in small chunks and yields
+    `(key, record)` tuples one at a time, so only a single record has to be
+    in memory. Values that are not arrays are yielded whole as `(key, value)`.
+
+    Example:
+        with path.open(encoding="utf-8") as f:
+            for key, record in ExportReader(f):
+                ...
+    """
+
+    WHITESPACE = " \t\n\r"
+
+    def __init__(self, f: TextIO, chunk_size: int = 64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Read the next chunk. Returns False if the end of file is reached."""
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if chunk == "":
+            self.eof = True
+            return False
+        # Drop the already consumed part of the buffer
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip the whitespace and return the next character."""
+        while True:
+            while (
+                self.pos < len(self.buffer)
+                and self.buffer[self.pos] in self.WHITESPACE
+            ):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise self._error("Unexpected end of document")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise self._error(f"Expecting one of {chars!r}")
+        self.pos += 1
+        return char
+
+    def _decode(self) -> Any:
+        """Decode a complete JSON value starting at the current position."""
+        self._peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value that reaches the end of the buffer might be
+                # truncated (e.g. a number), so make sure it's complete.
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self.buffer, self.pos)
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            key = self._decode()
+            self._expect(":")
+            if self._peek() == "[":
+                self.pos += 1
+                if self._peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self._decode()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                yield key, self._decode()
+            if self._expect(",}") == "}":
+                return
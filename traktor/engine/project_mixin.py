@@ -1,8 +1,11 @@
 from typing import List, Optional
 
 from tea_django import errors
+from django.db import transaction
 
 from traktor.models import User, Project
+from traktor.engine.retry import retry_on_lock
+from traktor.engine.slug_cache import slug_cache
 
 
 class ProjectMixin:
@@ -13,7 +16,11 @@ class ProjectMixin:
     @staticmethod
     def project_get(user: User, project_id: str) -> Project:
         try:
-            return Project.get_by_slug(slug=project_id, user=user)
+            return slug_cache.get(
+                model=Project,
+                key=("project", user.pk, project_id),
+                lookup=lambda: Project.get_by_slug(slug=project_id, user=user),
+            )
         except Project.DoesNotExist:
             raise errors.ObjectNotFound(
                 model=Project,
@@ -21,6 +28,8 @@ class ProjectMixin:
             )
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def project_create(
         cls, user: User, name: str, color: Optional[str] = None
     ) -> Project:
@@ -37,6 +46,8 @@ class ProjectMixin:
             )
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def project_update(
         cls,
         user: User,
@@ -55,6 +66,8 @@ class ProjectMixin:
         return project
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def project_delete(cls, user: User, project_id: str):
         project = cls.project_get(user=user, project_id=project_id)
         project.delete()
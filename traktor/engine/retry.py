@@ -0,0 +1,55 @@
+import time
+import random
+import functools
+from typing import Callable
+
+from django.db import OperationalError, transaction
+
+from traktor.profiler import profiler
+
+
+def is_locked(error: OperationalError) -> bool:
+    """Check if the error is caused by another connection holding a lock."""
+    return "locked" in str(error) or "busy" in str(error)
+
+
+def retry_on_lock(
+    func: Callable = None,
+    attempts: int = 5,
+    delay: float = 0.05,
+    max_delay: float = 1.0,
+):
+    """Retry the write when the database is locked by another process.
+
+    Waits for a random time up to the exponentially growing delay between
+    the attempts, so the processes that collided don't collide again. The
+    call is not retried inside an outer transaction, because the whole
+    transaction has to be retried. Retries are counted in the profiler.
+
+    Args:
+        func: Decorated function, when used without arguments.
+        attempts (int): Maximal number of attempts.
+        delay (float): Maximal wait in seconds before the first retry.
+        max_delay (float): Upper bound of the wait in seconds.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, attempts + 1):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    if (
+                        attempt == attempts
+                        or not is_locked(e)
+                        or transaction.get_connection().in_atomic_block
+                    ):
+                        raise
+                profiler.count("retries")
+                wait = min(max_delay, delay * 2 ** (attempt - 1))
+                time.sleep(random.uniform(0, wait))
+
+        return wrapper
+
+    return decorator if func is None else decorator(func)
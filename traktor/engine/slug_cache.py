@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from typing import Callable, Hashable, Type
+
+from django.db import models
+from django.dispatch import receiver
+from django.db.models.signals import post_delete, post_save
+
+from traktor.models import Project, Task
+
+
+class SlugCache:
+    """LRU cache of slug lookups to primary keys.
+
+    Resolving a task by slug joins through the project and the user, while
+    fetching it by primary key is a single index lookup. The cache is cleared
+    whenever a project or a task is saved or deleted in this process. Changes
+    made by other processes are not seen, so long running processes have to
+    clear it themselves when the database changes.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._ids = OrderedDict()
+
+    def get(
+        self,
+        model: Type[models.Model],
+        key: Hashable,
+        lookup: Callable[[], models.Model],
+    ) -> models.Model:
+        """Get an object by the cached primary key.
+
+        Args:
+            model: Model class of the object.
+            key: Cache key, e.g. `("task", user_id, project_id, task_id)`.
+            lookup: Function that looks up the object by slug when the key is
+                not in the cache.
+        """
+        pk = self._ids.get(key)
+        if pk is not None:
+            self._ids.move_to_end(key)
+            try:
+                return model.objects.get(pk=pk)
+            except model.DoesNotExist:
+                # Deleted outside of this process
+                del self._ids[key]
+
+        obj = lookup()
+        self._ids[key] = obj.pk
+        if len(self._ids) > self.maxsize:
+            self._ids.popitem(last=False)
+        return obj
+
+    def clear(self):
+        self._ids.clear()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+slug_cache = SlugCache()
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def clear_slug_cache(sender, **kwargs):
+    """Slugs and default tasks might have changed."""
+    slug_cache.clear()
@@ -1,8 +1,11 @@
 from typing import List, Optional
 
 from tea_django import errors
+from django.db import transaction
 
-from traktor.models import User, Project, Task
+from traktor.models import User, Task
+from traktor.engine.retry import retry_on_lock
+from traktor.engine.slug_cache import slug_cache
 from traktor.engine.project_mixin import ProjectMixin
 
 
@@ -34,8 +37,12 @@ class TaskMixin(ProjectMixin):
             task_id (str): Task slug.
         """
         try:
-            return Task.get_by_slug(
-                slug=task_id, project__user=user, project__slug=project_id,
+            return slug_cache.get(
+                model=Task,
+                key=("task", user.pk, project_id, task_id),
+                lookup=lambda: Task.get_by_slug(
+                    slug=task_id, project__user=user, project__slug=project_id
+                ),
             )
         except Task.DoesNotExist:
             raise errors.ObjectNotFound(
@@ -56,8 +63,12 @@ class TaskMixin(ProjectMixin):
             project_id (str): Project slug.
         """
         try:
-            return Task.objects.get(
-                project__user=user, project__slug=project_id, default=True
+            return slug_cache.get(
+                model=Task,
+                key=("default", user.pk, project_id),
+                lookup=lambda: Task.objects.get(
+                    project__user=user, project__slug=project_id, default=True
+                ),
             )
         except Task.DoesNotExist:
             raise errors.ObjectNotFound(
@@ -96,6 +107,8 @@ class TaskMixin(ProjectMixin):
             task.save()
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def task_create(
         cls,
         user: User,
@@ -113,7 +126,7 @@ class TaskMixin(ProjectMixin):
             color (str, optional): Task color.
             default (bool, optional): Is this a default task for this project.
         """
-        project = Project.get_by_slug(slug=project_id, user=user)
+        project = cls.project_get(user=user, project_id=project_id)
         try:
             Task.get_by_slug_field(value=name, project__id=project.id)
             raise errors.ObjectAlreadyExists(
@@ -138,6 +151,8 @@ class TaskMixin(ProjectMixin):
         return task
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def task_update(
         cls,
         user: User,
@@ -171,6 +186,8 @@ class TaskMixin(ProjectMixin):
         return task
 
     @classmethod
+    @retry_on_lock
+    @transaction.atomic
     def task_delete(cls, user: User, project_id: str, task_id: str):
         """Delete a task.
 
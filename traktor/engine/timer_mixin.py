@@ -1,100 +1,355 @@
 from typing import List, Optional
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from tea import timestamp as ts
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    DateTimeField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import (
+    Coalesce,
+    Greatest,
+    Least,
+    TruncMonth,
+    TruncWeek,
+)
 
 from traktor import errors
-from traktor.models import User, Entry, Report
+from traktor.config import config
+from traktor.enums import Bucket, GroupBy
+from traktor.models import (
+    User,
+    Entry,
+    ArchivedEntry,
+    Report,
+    Total,
+    DailyTotal,
+)
+from traktor.models.daily_total import bucket_start, day_start, split_by_day
+from traktor.engine.retry import retry_on_lock
 from traktor.engine.task_mixin import TaskMixin
 
 
+# Days of the daily totals are already whole days, grouping by the column
+# avoids calling the truncation function twice per row on SQLite
+TRUNC = {
+    Bucket.day: F,
+    Bucket.week: TruncWeek,
+    Bucket.month: TruncMonth,
+}
+
+
+# Starts of a timer that keeps being stopped and started by other processes
+START_ATTEMPTS = 3
+
+
 class TimerMixin(TaskMixin):
     # Timer
 
     @classmethod
+    @retry_on_lock
     def timer_start(
         cls, user: User, project_id: str, task_id: Optional[str] = None
     ) -> Entry:
-        # First see if there are running timers
-        entry = Entry.objects.filter(
-            task__project__user=user, end_time=None
-        ).first()
-        if entry is not None:
-            raise errors.TimerAlreadyRunning(
-                project_id=entry.task.project.slug, task_id=entry.task.slug
-            )
+        """Start the timer.
 
-        if task_id is None:
-            task = cls.task_get_default(user=user, project_id=project_id)
-            if task is None:
-                raise errors.NoDefaultTask(
-                    user=user.username, project_id=project_id
-                )
-        else:
-            task = cls.task_get(
-                user=user, project_id=project_id, task_id=task_id
-            )
+        Runs in a single transaction with at most two statements: the task
+        lookup (a primary key fetch if the slugs are cached) and the insert.
+        There is no check for a running timer. Running user is unique, so the
+        database rejects the second running timer even if two timers are
+        started at the same time. If the running timer was stopped before it
+        could be reported, the start is tried again.
+        """
+        column = Entry._meta.get_field("running_user").column
+        for _ in range(START_ATTEMPTS):
+            try:
+                with transaction.atomic():
+                    if task_id is None:
+                        task = cls.task_get_default(
+                            user=user, project_id=project_id
+                        )
+                    else:
+                        task = cls.task_get(
+                            user=user, project_id=project_id, task_id=task_id
+                        )
+                    return Entry.objects.create(task=task, running_user=user)
+            except IntegrityError as e:
+                # Only a violation of the running user unique constraint
+                # means that the timer is running, the column is named in
+                # the message
+                if column not in str(e):
+                    raise
+                entry = Entry.objects.filter(running_user=user).first()
+                if entry is not None:
+                    raise errors.TimerAlreadyRunning(
+                        project_id=entry.task.project.slug,
+                        task_id=entry.task.slug,
+                    )
+                error = e
+        raise error
 
-        return Entry.objects.create(task=task)
-
-    @staticmethod
-    def timer_stop(user: User) -> Entry:
-        entry = Entry.objects.filter(
-            task__project__user=user, end_time=None
-        ).first()
-        if entry is None:
-            raise errors.TimerIsNotRunning()
+    @classmethod
+    @retry_on_lock
+    def timer_stop(cls, user: User) -> Entry:
+        """Stop the timer.
 
-        entry.stop()
-        entry.save()
+        Runs in a single transaction with three statements: the running entry
+        lookup, an update of only the changed columns and an upsert of the
+        daily total by the signal handlers. An entry that spans midnight
+        costs one more upsert per additional day.
+        """
+        with transaction.atomic():
+            entry = cls.timer_status(user=user)
+            entry.stop()
+            entry.save(
+                update_fields=[
+                    "end_time",
+                    "duration",
+                    "running_user",
+                    "updated_on",
+                ]
+            )
         return entry
 
     @staticmethod
-    def timer_status(user: User) -> Optional[Entry]:
-        entry = Entry.objects.filter(
-            task__project__user=user, end_time=None
-        ).first()
-        if entry is None:
+    def timer_status(user: User) -> Entry:
+        try:
+            return Entry.objects.get(running_user=user)
+        except Entry.DoesNotExist:
             raise errors.TimerIsNotRunning()
-        return entry
 
     @staticmethod
-    def _make_report(entries: List[Entry]) -> List[Report]:
-        reports = {}
-        for entry in entries:
-            report = Report(
-                user=entry.task.project.user.username,
-                project=entry.task.project.name,
-                task=entry.task.name,
-                duration=(
-                    entry.duration
-                    or int((ts.now() - entry.start_time).total_seconds())
-                ),
+    def _make_report(user: User, since: Optional[date] = None) -> List[Report]:
+        """Aggregate the time spent per project and task since a day.
+
+        Finished entries are read from the daily totals, so the cost depends
+        on the number of days and not the number of entries. Only the running
+        entry is read from the entries, and it contributes the time elapsed
+        since it was started or since the start of the `since` day.
+
+        Args:
+            user (User): User whose time is reported.
+            since (date, optional): First day of the report in the configured
+                timezone. If not set, all the time is reported.
+        """
+        totals = DailyTotal.objects.filter(user=user)
+        if since is not None:
+            totals = totals.filter(day__gte=since)
+        rows = totals.values("task__project__name", "task__name").annotate(
+            total=Sum("duration")
+        )
+        durations = {
+            (row["task__project__name"], row["task__name"]): row["total"]
+            for row in rows
+        }
+
+        now = ts.now()
+        running = Entry.objects.filter(
+            running_user=user, task__isnull=False
+        ).values("task__project__name", "task__name", "start_time")
+        for row in running:
+            start_time = row["start_time"]
+            if since is not None:
+                start_time = max(start_time, day_start(since))
+            key = (row["task__project__name"], row["task__name"])
+            durations[key] = durations.get(key, 0) + max(
+                int((now - start_time).total_seconds()), 0
             )
-            if report.key in reports:
-                reports[report.key].duration += report.duration
-            else:
-                reports[report.key] = report
-        return list(reports.values())
 
-    @classmethod
-    def timer_today(cls, user: User):
+        return [
+            Report(
+                user=user.username,
+                project=project,
+                task=task,
+                duration=duration,
+            )
+            for (project, task), duration in sorted(durations.items())
+        ]
+
+    @staticmethod
+    def time_spent(
+        user: User,
+        start: datetime,
+        end: datetime,
+        group_by: GroupBy = GroupBy.task,
+    ) -> List[Report]:
+        """Aggregate the time spent in a time window.
+
+        Entries that overlap the window are clipped to it in the query, so an
+        entry that crosses the window edge contributes only the part inside
+        the window and a running entry contributes the time until now.
+
+        Overlapping entries are found with a start time range on the start
+        time index. The range starts one longest entry before the window,
+        which is the earliest a finished overlapping entry could have
+        started, or at the running entry if it started even earlier. The
+        longest duration is read from the end of the duration index and the
+        running entry by the running user, so both lookups are cheap. The
+        longest duration is of all users, since a per user maximum would
+        have to join the tasks, so a long entry of another user only widens
+        the range. The archive is queried the same way, but only if the
+        window starts before the end of the archive.
+
+        Args:
+            user (User): User whose time is reported.
+            start (datetime): Start of the window.
+            end (datetime): End of the window, exclusive.
+            group_by (GroupBy): Aggregate per project or per task. When
+                grouped by project, task of the reports is empty.
+        """
+        if end <= start:
+            return []
+        models = [Entry]
+        until = ArchivedEntry.archived_until()
+        if until is not None and start < until:
+            models.append(ArchivedEntry)
+
         now = ts.now()
-        today = ts.make_aware(datetime(now.year, now.month, now.day))
-        return cls._make_report(
-            Entry.objects.filter(
-                task__project__user=user, start_time__gt=today
+        window_start = Value(start, output_field=DateTimeField())
+        window_end = Value(end, output_field=DateTimeField())
+        clipped = ExpressionWrapper(
+            Least(
+                Coalesce("end_time", Value(now, output_field=DateTimeField())),
+                window_end,
             )
+            - Greatest("start_time", window_start),
+            output_field=DurationField(),
         )
 
+        fields = ["task__project__name"]
+        if group_by == GroupBy.task:
+            fields.append("task__name")
+        totals = {}
+        for model in models:
+            longest = model.objects.aggregate(Max("duration"))["duration__max"]
+            earliest = start - timedelta(seconds=longest or 0)
+            overlaps = Q(end_time__gt=start)
+            if model is Entry:
+                running = (
+                    Entry.objects.filter(running_user=user)
+                    .values_list("start_time", flat=True)
+                    .first()
+                )
+                if running is not None:
+                    earliest = min(earliest, running)
+                    overlaps |= Q(running_user=user)
+
+            rows = (
+                model.objects.filter(
+                    overlaps,
+                    task__project__user=user,
+                    start_time__gte=earliest,
+                    start_time__lt=end,
+                )
+                .order_by()
+                .values(*fields)
+                .annotate(total=Sum(clipped))
+                .order_by()
+            )
+            for row in rows:
+                key = (row["task__project__name"], row.get("task__name", ""))
+                totals[key] = totals.get(key, timedelta()) + row["total"]
+
+        return [
+            Report(
+                user=user.username,
+                project=project,
+                task=task,
+                duration=max(int(total.total_seconds()), 0),
+            )
+            for (project, task), total in sorted(totals.items())
+        ]
+
+    @staticmethod
+    def timer_series(
+        user: User,
+        bucket: Bucket,
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+    ) -> List[Total]:
+        """Aggregate the time spent per period, project and task.
+
+        Finished entries are aggregated in a single grouped query over the
+        daily totals with the day truncated to the period. Days are already
+        in the configured timezone and entries that cross midnight are split
+        between the days, so the truncation needs no timezone conversion.
+        Only the running entry is split by day in Python.
+
+        Args:
+            user (User): User whose time is reported.
+            bucket (Bucket): Aggregate per day, week or month.
+            since (date, optional): First day of the series in the configured
+                timezone. If not set, the series starts with the first entry.
+            until (date, optional): Day the series ends, exclusive. If not
+                set, the series ends now.
+        """
+        totals = DailyTotal.objects.filter(user=user)
+        if since is not None:
+            totals = totals.filter(day__gte=since)
+        if until is not None:
+            totals = totals.filter(day__lt=until)
+        rows = (
+            totals.annotate(period=TRUNC[bucket]("day"))
+            .values("period", "task__project__name", "task__name")
+            .annotate(total=Sum("duration"))
+            .order_by()
+        )
+        durations = {
+            (
+                row["period"],
+                row["task__project__name"],
+                row["task__name"],
+            ): row["total"]
+            for row in rows
+        }
+
+        now = ts.now()
+        end_time = now if until is None else min(now, day_start(until))
+        running = Entry.objects.filter(
+            running_user=user, task__isnull=False
+        ).values("task__project__name", "task__name", "start_time")
+        for row in running:
+            start_time = row["start_time"]
+            if since is not None:
+                start_time = max(start_time, day_start(since))
+            if start_time >= end_time:
+                continue
+            for day, seconds in split_by_day(
+                start_time,
+                end_time,
+                int((end_time - start_time).total_seconds()),
+            ):
+                key = (
+                    bucket_start(bucket, day),
+                    row["task__project__name"],
+                    row["task__name"],
+                )
+                durations[key] = durations.get(key, 0) + seconds
+
+        return [
+            Total(period=period, project=project, task=task, duration=duration)
+            for (period, project, task), duration in sorted(durations.items())
+        ]
+
+    @staticmethod
+    def _today() -> date:
+        return ts.now().astimezone(config.timezone).date()
+
+    @classmethod
+    def timer_today(cls, user: User) -> List[Report]:
+        return cls._make_report(user=user, since=cls._today())
+
     @classmethod
     def timer_report(cls, user: User, days: int = 0) -> List[Report]:
         if days == 0:
-            entries = Entry.objects.filter(task__project__user=user)
-        else:
-            dt = ts.now() - timedelta(days=days)
-            since = ts.make_aware(datetime(dt.year, dt.month, dt.day))
-            entries = Entry.objects.filter(
-                task__project__user=user, start_time__gt=since
-            )
-        return cls._make_report(entries)
+            return cls._make_report(user=user)
+        return cls._make_report(
+            user=user, since=cls._today() - timedelta(days=days)
+        )
@@ -0,0 +1,40 @@
+import enum
+
+
+class Compression(str, enum.Enum):
+    none = "none"
+    gzip = "gzip"
+    lzma = "lzma"
+
+
+class JournalMode(str, enum.Enum):
+    delete = "delete"
+    truncate = "truncate"
+    persist = "persist"
+    memory = "memory"
+    wal = "wal"
+    off = "off"
+
+
+class Synchronous(str, enum.Enum):
+    off = "off"
+    normal = "normal"
+    full = "full"
+    extra = "extra"
+
+
+class TempStore(str, enum.Enum):
+    default = "default"
+    file = "file"
+    memory = "memory"
+
+
+class GroupBy(str, enum.Enum):
+    project = "project"
+    task = "task"
+
+
+class Bucket(str, enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
@@ -29,3 +29,75 @@ class NoDefaultTask(TraktorError):
             message=f"No default task found for user: {user}, "
             f"project: {project_id}."
         )
+
+
+class ExportWatermarkNotFound(TraktorError):
+    def __init__(self):
+        super().__init__(message="No previous export found.")
+
+
+class InvalidExportChain(TraktorError):
+    def __init__(self, path: str, since: str, until: str):
+        self.path = path
+        self.since = since
+        self.until = until
+
+        super().__init__(
+            message=f"Export {path} contains changes since {since}, but the "
+            f"previous export ends at {until}."
+        )
+
+
+class BackupNotSupported(TraktorError):
+    def __init__(self, engine: str):
+        self.engine = engine
+
+        super().__init__(
+            message=f"Binary backups are not supported for {engine} database."
+        )
+
+
+class SearchIndexNotSupported(TraktorError):
+    def __init__(self, engine: str):
+        self.engine = engine
+
+        super().__init__(
+            message=f"Full-text search index is not supported for {engine} "
+            f"database."
+        )
+
+
+class BackupCorrupted(TraktorError):
+    def __init__(self, path: str, reason: str):
+        self.path = path
+        self.reason = reason
+
+        super().__init__(message=f"Backup {path} is corrupted: {reason}")
+
+
+class DaemonAlreadyRunning(TraktorError):
+    def __init__(self, path: str):
+        self.path = path
+
+        super().__init__(message=f"Daemon is already running on {path}.")
+
+
+class InvalidSearchQuery(TraktorError):
+    def __init__(self, query: str, reason: str):
+        self.query = query
+        self.reason = reason
+
+        super().__init__(message=f"Invalid search query {query}: {reason}")
+
+
+class ImportedTimerConflict(TraktorError):
+    def __init__(self, user: str, project_id: str, task_id: str):
+        self.user = user
+        self.project_id = project_id
+        self.task_id = task_id
+
+        super().__init__(
+            message=f"Import has a running timer for {user}, but the timer "
+            f"is already running for {project_id}/{task_id}. Stop it before "
+            f"importing."
+        )
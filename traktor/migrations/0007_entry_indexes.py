@@ -0,0 +1,28 @@
+# Generated by Django 3.1 on 2020-09-05 12:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0006_project_slug_unique_for_user"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                condition=models.Q(end_time=None),
+                fields=["task", "end_time"],
+                name="entry_running_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["task", "start_time"],
+                name="entry_task_start_time_idx",
+            ),
+        ),
+    ]
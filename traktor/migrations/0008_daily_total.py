@@ -0,0 +1,106 @@
+# Generated by Django 3.1 on 2020-09-12 10:17
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+import tea_console.table
+import uuid
+
+
+def split_by_day(tz, start_time, end_time, duration):
+    """Split a finished entry into `(day, seconds)` pieces.
+
+    Copy of `traktor.models.daily_total.split_by_day` as it was when the
+    migration was written, so later changes don't change the migration.
+    """
+    start = start_time
+    day = start_time.astimezone(tz).date()
+    remaining = duration
+    while True:
+        midnight = tz.localize(
+            datetime.combine(day + timedelta(days=1), time())
+        )
+        if end_time <= midnight:
+            yield day, remaining
+            return
+        seconds = min(int((midnight - start).total_seconds()), remaining)
+        yield day, seconds
+        remaining -= seconds
+        start = midnight
+        day += timedelta(days=1)
+
+
+def fill_daily_totals(apps, schema_editor):
+    DailyTotal = apps.get_model("traktor", "DailyTotal")
+    Entry = apps.get_model("traktor", "Entry")
+    # Time zone setting is the configured time zone
+    tz = timezone.get_default_timezone()
+    totals = defaultdict(int)
+    entries = (
+        Entry.objects.filter(task__isnull=False, end_time__isnull=False)
+        .values_list(
+            "task__project__user_id",
+            "task_id",
+            "start_time",
+            "end_time",
+            "duration",
+        )
+        .iterator()
+    )
+    for user_id, task_id, start_time, end_time, duration in entries:
+        for day, seconds in split_by_day(tz, start_time, end_time, duration):
+            totals[user_id, task_id, day] += seconds
+    DailyTotal.objects.bulk_create(
+        (
+            DailyTotal(
+                user_id=user_id, task_id=task_id, day=day, duration=value
+            )
+            for (user_id, task_id, day), value in totals.items()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("traktor", "0007_entry_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyTotal",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, primary_key=True, serialize=False
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("duration", models.BigIntegerField(default=0)),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="traktor.task",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={"unique_together": {("user", "day", "task")}},
+            bases=(models.Model, tea_console.table.RichTableMixin),
+        ),
+        migrations.RunPython(fill_daily_totals, migrations.RunPython.noop),
+    ]
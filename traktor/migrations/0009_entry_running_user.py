@@ -0,0 +1,98 @@
+# Generated by Django 3.1 on 2020-09-13 16:52
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def split_by_day(tz, start_time, end_time, duration):
+    """Split a finished entry into `(day, seconds)` pieces.
+
+    Copy of `traktor.models.daily_total.split_by_day` as it was when the
+    migration was written, so later changes don't change the migration.
+    """
+    start = start_time
+    day = start_time.astimezone(tz).date()
+    remaining = duration
+    while True:
+        midnight = tz.localize(
+            datetime.combine(day + timedelta(days=1), time())
+        )
+        if end_time <= midnight:
+            yield day, remaining
+            return
+        seconds = min(int((midnight - start).total_seconds()), remaining)
+        yield day, seconds
+        remaining -= seconds
+        start = midnight
+        day += timedelta(days=1)
+
+
+def fill_running_user(apps, schema_editor):
+    DailyTotal = apps.get_model("traktor", "DailyTotal")
+    Entry = apps.get_model("traktor", "Entry")
+    # Time zone setting is the configured time zone
+    tz = timezone.get_default_timezone()
+    running = (
+        Entry.objects.filter(end_time=None, task__isnull=False)
+        .order_by("-start_time")
+        .values_list("pk", "task__project__user_id", "task_id", "start_time")
+    )
+    next_start = {}
+    for pk, user_id, task_id, start_time in list(running):
+        if user_id not in next_start:
+            # Only the latest running entry if a user has more of them
+            Entry.objects.filter(pk=pk).update(running_user_id=user_id)
+            next_start[user_id] = start_time
+            continue
+
+        # Older ones are stopped when the next one started, otherwise they
+        # would stay running without a way to stop them
+        end_time = next_start[user_id]
+        duration = int((end_time - start_time).total_seconds())
+        Entry.objects.filter(pk=pk).update(
+            end_time=end_time, duration=duration, updated_on=timezone.now()
+        )
+        for day, seconds in split_by_day(tz, start_time, end_time, duration):
+            total, _ = DailyTotal.objects.get_or_create(
+                user_id=user_id, task_id=task_id, day=day
+            )
+            DailyTotal.objects.filter(pk=total.pk).update(
+                duration=models.F("duration") + seconds
+            )
+        next_start[user_id] = start_time
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0008_daily_total"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="entry",
+            name="running_user",
+            field=models.OneToOneField(
+                blank=True,
+                default=None,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="running_entry",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.RunPython(fill_running_user, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="entry",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    ("running_user", None), ("end_time", None), _connector="OR"
+                ),
+                name="entry_running_user_is_running",
+            ),
+        ),
+    ]
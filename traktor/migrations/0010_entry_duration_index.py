@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2020-09-20 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0009_entry_running_user"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(fields=["duration"], name="entry_duration_idx"),
+        ),
+    ]
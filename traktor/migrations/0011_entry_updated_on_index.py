@@ -0,0 +1,19 @@
+# Generated by Django 3.1 on 2020-09-22 19:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0010_entry_duration_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["updated_on"], name="entry_updated_on_idx"
+            ),
+        ),
+    ]
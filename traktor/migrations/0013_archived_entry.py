@@ -0,0 +1,76 @@
+# Generated by Django 3.1 on 2020-09-24 20:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import tea.timestamp
+import tea_console.table
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0012_entry_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedEntry",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4, primary_key=True, serialize=False
+                    ),
+                ),
+                (
+                    "start_time",
+                    models.DateTimeField(
+                        blank=True, default=tea.timestamp.now
+                    ),
+                ),
+                (
+                    "end_time",
+                    models.DateTimeField(blank=True, default=None, null=True),
+                ),
+                ("duration", models.BigIntegerField(default=0)),
+                ("created_on", models.DateTimeField(auto_now_add=True)),
+                ("updated_on", models.DateTimeField(auto_now=True)),
+                (
+                    "description",
+                    models.CharField(blank=True, default="", max_length=1023),
+                ),
+                ("notes", models.TextField(blank=True, default="")),
+                (
+                    "task",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="archived_entries",
+                        to="traktor.task",
+                    ),
+                ),
+            ],
+            bases=(models.Model, tea_console.table.RichTableMixin),
+        ),
+        migrations.AddIndex(
+            model_name="archivedentry",
+            index=models.Index(
+                fields=["task", "start_time"],
+                name="archived_task_start_time_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedentry",
+            index=models.Index(
+                fields=["end_time"], name="archived_end_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedentry",
+            index=models.Index(
+                fields=["duration"], name="archived_duration_idx"
+            ),
+        ),
+    ]
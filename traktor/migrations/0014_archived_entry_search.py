@@ -0,0 +1,81 @@
+from django.db import migrations
+
+
+# Statements are copied from `traktor.models.entry_search` as they were when
+# the migration was written, so later changes don't change the migration.
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS traktor_archivedentry_fts USING fts5(
+        entry_id UNINDEXED,
+        description,
+        notes,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS traktor_archivedentry_fts_insert
+    AFTER INSERT ON traktor_archivedentry
+    WHEN new.description != '' OR new.notes != ''
+    BEGIN
+        INSERT OR REPLACE INTO traktor_archivedentry_fts
+            (rowid, entry_id, description, notes)
+        VALUES (new.rowid, new.id, new.description, new.notes);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS traktor_archivedentry_fts_delete
+    AFTER DELETE ON traktor_archivedentry
+    WHEN old.description != '' OR old.notes != ''
+    BEGIN
+        DELETE FROM traktor_archivedentry_fts
+        WHERE rowid = old.rowid AND entry_id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS traktor_archivedentry_fts_update
+    AFTER UPDATE OF description, notes ON traktor_archivedentry
+    WHEN old.description IS NOT new.description
+        OR old.notes IS NOT new.notes
+    BEGIN
+        DELETE FROM traktor_archivedentry_fts
+        WHERE rowid = old.rowid AND entry_id = old.id;
+        INSERT OR REPLACE INTO traktor_archivedentry_fts
+            (rowid, entry_id, description, notes)
+        SELECT new.rowid, new.id, new.description, new.notes
+        WHERE new.description != '' OR new.notes != '';
+    END
+    """,
+    """
+    INSERT INTO traktor_archivedentry_fts (rowid, entry_id, description, notes)
+    SELECT rowid, id, description, notes FROM traktor_archivedentry
+    WHERE description != '' OR notes != ''
+    """,
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS traktor_archivedentry_fts_update",
+    "DROP TRIGGER IF EXISTS traktor_archivedentry_fts_delete",
+    "DROP TRIGGER IF EXISTS traktor_archivedentry_fts_insert",
+    "DROP TABLE IF EXISTS traktor_archivedentry_fts",
+]
+
+
+def execute(statements):
+    def run(apps, schema_editor):
+        # FTS5 is SQLite only, other databases search without an index
+        if schema_editor.connection.vendor == "sqlite":
+            for sql in statements:
+                schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0013_archived_entry"),
+    ]
+
+    operations = [
+        migrations.RunPython(execute(SCHEMA), execute(DROP)),
+    ]
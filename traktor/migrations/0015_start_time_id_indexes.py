@@ -0,0 +1,26 @@
+# Generated by Django 3.1 on 2020-09-26 10:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0014_archived_entry_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="entry",
+            index=models.Index(
+                fields=["start_time", "id"], name="entry_start_time_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedentry",
+            index=models.Index(
+                fields=["start_time", "id"],
+                name="archived_start_time_id_idx",
+            ),
+        ),
+    ]
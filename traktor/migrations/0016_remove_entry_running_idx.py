@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2020-09-27 09:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("traktor", "0015_start_time_id_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="entry",
+            name="entry_running_idx",
+        ),
+    ]
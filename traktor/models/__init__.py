@@ -1,8 +1,24 @@
-__all__ = ["User", "Project", "Task", "Entry", "Report", "signals"]
+__all__ = [
+    "User",
+    "Project",
+    "Task",
+    "Entry",
+    "ArchivedEntry",
+    "Report",
+    "Total",
+    "Percentile",
+    "DailyTotal",
+    "EntrySearch",
+    "Hit",
+    "signals",
+]
 
 from traktor.models.user import User
 from traktor.models.project import Project
 from traktor.models.task import Task
 from traktor.models.entry import Entry
-from traktor.models.report import Report
+from traktor.models.archived_entry import ArchivedEntry
+from traktor.models.report import Report, Total, Percentile
+from traktor.models.daily_total import DailyTotal
+from traktor.models.entry_search import EntrySearch, Hit
 from traktor.models import signals
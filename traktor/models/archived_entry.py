@@ -0,0 +1,96 @@
+from datetime import datetime
+from typing import Optional
+
+from django.db import models
+
+from tea import timestamp as ts
+from tea_console.table import Column
+from tea_django.models import UUIDBaseModel
+from tea_django.models.mixins import TimestampedMixin, TimerMixin
+
+from traktor.models.task import Task
+from traktor.models.entry import EntryManager
+
+
+class ArchivedEntry(UUIDBaseModel, TimestampedMixin, TimerMixin):
+    """Finished entry moved out of the entries table by `db archive`.
+
+    Same columns as `Entry` without the running user, since only finished
+    entries are archived. The daily totals keep the archived time, so only
+    the queries that read the raw entries have to look into the archive,
+    and only when their range starts before `archived_until`.
+    """
+
+    HEADERS = [
+        Column(title="Project", path="task.project.name"),
+        Column(title="Task", path="task.name"),
+        Column(
+            title="Start Time",
+            path=lambda o: ts.to_localtime_str(o.start_time),
+        ),
+        Column(
+            title="End Time",
+            path=lambda o: ts.to_localtime_str(o.end_time),
+        ),
+        Column(title="Duration", path="running_time"),
+    ]
+    task = models.ForeignKey(
+        Task,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="archived_entries",
+    )
+    description = models.CharField(
+        max_length=1023, null=False, blank=True, default=""
+    )
+    notes = models.TextField(null=False, blank=True, default="")
+
+    def __str__(self):
+        return (
+            f"ArchivedEntry(project={self.task.project.slug}, "
+            f"task={self.task.slug if self.task is not None else None}, "
+            f"running_time={self.running_time})"
+        )
+
+    __repr__ = __str__
+
+    def to_dict(self) -> dict:
+        d = super().to_dict()
+        d.update(
+            {
+                "project": self.task.project.slug,
+                "task": self.task.slug,
+                "running_time": self.running_time,
+            }
+        )
+        return d
+
+    @classmethod
+    def archived_until(cls) -> Optional[datetime]:
+        """Return the end of the latest archived entry, None if empty.
+
+        Every archived entry started and ended before it.
+        """
+        return cls.objects.aggregate(until=models.Max("end_time"))["until"]
+
+    objects = EntryManager()
+
+    class Meta:
+        app_label = "traktor"
+        indexes = [
+            # Time range lookups: `start_time > ...` for user's tasks.
+            models.Index(
+                fields=["task", "start_time"],
+                name="archived_task_start_time_idx",
+            ),
+            # Archive boundary: `MAX(end_time)`.
+            models.Index(fields=["end_time"], name="archived_end_time_idx"),
+            # Longest entry: `MAX(duration)` bounds the time range lookups.
+            models.Index(fields=["duration"], name="archived_duration_idx"),
+            # Keyset pagination: `(start_time, id) > (...)` in this order.
+            models.Index(
+                fields=["start_time", "id"],
+                name="archived_start_time_id_idx",
+            ),
+        ]
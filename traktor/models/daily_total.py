@@ -0,0 +1,200 @@
+import uuid
+import itertools
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+from datetime import date, datetime, time, timedelta
+
+from django.db import connection, models
+from tea_django.models import UUIDBaseModel
+
+from traktor.config import config
+from traktor.enums import Bucket
+from traktor.models.user import User
+from traktor.models.task import Task
+from traktor.models.entry import Entry
+from traktor.models.archived_entry import ArchivedEntry
+
+
+def day_start(day: date) -> datetime:
+    """Return the midnight that starts the day in the configured timezone."""
+    return config.timezone.localize(datetime.combine(day, time()))
+
+
+def bucket_start(bucket: Bucket, day: date) -> date:
+    """Return the first day of the bucket.
+
+    Weeks start on Monday like in `TruncWeek`.
+    """
+    if bucket == Bucket.week:
+        return day - timedelta(days=day.weekday())
+    if bucket == Bucket.month:
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(bucket: Bucket, day: date) -> date:
+    """Return the first day of the next bucket."""
+    if bucket == Bucket.week:
+        return day + timedelta(days=7)
+    if bucket == Bucket.month:
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def split_by_day(
+    start_time: datetime, end_time: datetime, duration: int
+) -> Iterator[Tuple[date, int]]:
+    """Split a finished entry into `(day, seconds)` pieces.
+
+    Days are calendar days in the configured timezone, so an entry that spans
+    midnight contributes to both days. The last piece takes the rounding
+    remainder so the pieces always add up to the entry duration.
+    """
+    start = start_time
+    day = start_time.astimezone(config.timezone).date()
+    remaining = duration
+    while True:
+        midnight = day_start(day + timedelta(days=1))
+        if end_time <= midnight:
+            yield day, remaining
+            return
+        seconds = min(int((midnight - start).total_seconds()), remaining)
+        yield day, seconds
+        remaining -= seconds
+        start = midnight
+        day += timedelta(days=1)
+
+
+# Adds the seconds to the day in one statement whether the row exists or not.
+# The original row is referred to by the table name, like PostgreSQL needs.
+UPSERT = """
+    INSERT INTO traktor_dailytotal (id, user_id, task_id, day, duration)
+    VALUES (%s, %s, %s, %s, %s)
+    ON CONFLICT (user_id, day, task_id) DO UPDATE
+    SET duration = traktor_dailytotal.duration + excluded.duration
+"""
+
+
+class DailyTotal(UUIDBaseModel):
+    """Time spent on a task per day.
+
+    Rollup of the finished entries that is kept up to date by the signal
+    handlers in `traktor.models.signals`, so long range reports don't have to
+    scan the raw entries. Archiving entries doesn't change it, so reports
+    never read the archive.
+    """
+
+    user = models.ForeignKey(
+        User, null=False, blank=False, on_delete=models.CASCADE
+    )
+    task = models.ForeignKey(
+        Task, null=False, blank=False, on_delete=models.CASCADE
+    )
+    day = models.DateField(null=False, blank=False)
+    duration = models.BigIntegerField(null=False, blank=False, default=0)
+
+    @classmethod
+    def add(
+        cls,
+        user_id: int,
+        task_id: str,
+        start_time: datetime,
+        end_time: datetime,
+        duration: int,
+        sign: int = 1,
+    ):
+        """Add (or with `sign=-1` subtract) a finished entry to the rollup.
+
+        Adding is a single upsert per day of the entry on the databases that
+        support `ON CONFLICT`, so stopping the timer costs one statement for
+        the rollup.
+        """
+        upsert = sign > 0 and connection.vendor in ("sqlite", "postgresql")
+        for day, seconds in split_by_day(start_time, end_time, duration):
+            delta = sign * seconds
+            if upsert:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        UPSERT,
+                        [
+                            cls._meta.pk.get_db_prep_value(
+                                uuid.uuid4(), connection
+                            ),
+                            user_id,
+                            cls._meta.get_field("task").get_db_prep_value(
+                                task_id, connection
+                            ),
+                            connection.ops.adapt_datefield_value(day),
+                            delta,
+                        ],
+                    )
+                continue
+            rollup = cls.objects.filter(
+                user_id=user_id, task_id=task_id, day=day
+            )
+            updated = rollup.update(duration=models.F("duration") + delta)
+            if updated == 0:
+                cls.objects.create(
+                    user_id=user_id, task_id=task_id, day=day, duration=delta
+                )
+            elif sign < 0:
+                # Drop the days that are left without any time
+                rollup.filter(duration=0).delete()
+
+    @staticmethod
+    def aggregate(
+        entries: Iterable[Tuple[int, str, datetime, datetime, int]]
+    ) -> Dict[Tuple[int, str, date], int]:
+        """Aggregate `(user_id, task_id, start, end, duration)` tuples."""
+        totals = defaultdict(int)
+        for user_id, task_id, start_time, end_time, duration in entries:
+            for day, seconds in split_by_day(start_time, end_time, duration):
+                totals[user_id, task_id, day] += seconds
+        return totals
+
+    @classmethod
+    def rebuild(cls, user: Optional[User] = None, batch_size: int = 500):
+        """Regenerate the rollup from the finished and archived entries."""
+        rollups = cls.objects.all()
+        querysets = [
+            model.objects.select_related(None).filter(
+                task__isnull=False, end_time__isnull=False
+            )
+            for model in (Entry, ArchivedEntry)
+        ]
+        if user is not None:
+            rollups = rollups.filter(user=user)
+            querysets = [
+                queryset.filter(task__project__user=user)
+                for queryset in querysets
+            ]
+
+        totals = cls.aggregate(
+            itertools.chain.from_iterable(
+                queryset.values_list(
+                    "task__project__user_id",
+                    "task_id",
+                    "start_time",
+                    "end_time",
+                    "duration",
+                ).iterator()
+                for queryset in querysets
+            )
+        )
+        rollups.delete()
+        cls.objects.bulk_create(
+            (
+                cls(user_id=user_id, task_id=task_id, day=day, duration=value)
+                for (user_id, task_id, day), value in totals.items()
+            ),
+            batch_size=batch_size,
+        )
+
+    def __str__(self):
+        return f"DailyTotal(day={self.day}, task={self.task_id})"
+
+    __repr__ = __str__
+
+    class Meta:
+        app_label = "traktor"
+        unique_together = [["user", "day", "task"]]
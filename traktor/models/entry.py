@@ -5,6 +5,7 @@ from tea_console.table import Column
 from tea_django.models import UUIDBaseModel
 from tea_django.models.mixins import TimestampedMixin, TimerMixin
 
+from traktor.models.user import User
 from traktor.models.task import Task
 
 
@@ -33,6 +34,16 @@ class Entry(UUIDBaseModel, TimestampedMixin, TimerMixin):
         max_length=1023, null=False, blank=True, default=""
     )
     notes = models.TextField(null=False, blank=True, default="")
+    # Set only while the entry is running. Unique, so a user can't have more
+    # than one running entry, and the running entry is a single index lookup.
+    running_user = models.OneToOneField(
+        User,
+        null=True,
+        blank=True,
+        default=None,
+        on_delete=models.CASCADE,
+        related_name="running_entry",
+    )
 
     def __str__(self):
         return (
@@ -43,6 +54,10 @@ class Entry(UUIDBaseModel, TimestampedMixin, TimerMixin):
 
     __repr__ = __str__
 
+    def stop(self):
+        super().stop()
+        self.running_user = None
+
     def to_dict(self) -> dict:
         d = super().to_dict()
         d.update(
@@ -58,3 +73,23 @@ class Entry(UUIDBaseModel, TimestampedMixin, TimerMixin):
 
     class Meta:
         app_label = "traktor"
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(running_user=None) | models.Q(end_time=None),
+                name="entry_running_user_is_running",
+            ),
+        ]
+        indexes = [
+            # Time range lookups: `start_time > ...` for user's tasks.
+            models.Index(
+                fields=["task", "start_time"], name="entry_task_start_time_idx"
+            ),
+            # Longest entry: `MAX(duration)` bounds the time range lookups.
+            models.Index(fields=["duration"], name="entry_duration_idx"),
+            # Changed entries: `updated_on >= ...` for caches and deltas.
+            models.Index(fields=["updated_on"], name="entry_updated_on_idx"),
+            # Keyset pagination: `(start_time, id) > (...)` in this order.
+            models.Index(
+                fields=["start_time", "id"], name="entry_start_time_id_idx"
+            ),
+        ]
@@ -0,0 +1,252 @@
+"""Full-text index of the entry descriptions and notes.
+
+SQLite FTS5 tables kept in sync with the entries and the archived entries by
+triggers, so bulk inserts and deletes that bypass the model signals, like
+archiving, are indexed too. Only entries with a description or notes are
+indexed. Rows are keyed by the entry rowid, so the triggers and the search
+look the rows up by an integer key and not by a scan, and the entry id is
+stored to guard against a stale index.
+"""
+
+from datetime import datetime
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from rich.markup import escape
+from django.db import connection
+from tea import timestamp as ts
+from tea_console.table import Column
+from tea_django.models import VanillaModel
+
+
+# Full-text index table of the entries and of the archived entries
+TABLES = {
+    "traktor_entry": "traktor_entry_fts",
+    "traktor_archivedentry": "traktor_archivedentry_fts",
+}
+
+INDEXED = "new.description != '' OR new.notes != ''"
+
+
+def schema(source: str, table: str) -> List[str]:
+    """Return the statements creating the index of a table and its triggers.
+
+    Args:
+        source (str): Indexed table.
+        table (str): Full-text index table.
+    """
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5(
+            entry_id UNINDEXED,
+            description,
+            notes,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_insert
+        AFTER INSERT ON {source} WHEN {INDEXED}
+        BEGIN
+            INSERT OR REPLACE INTO {table}
+                (rowid, entry_id, description, notes)
+            VALUES (new.rowid, new.id, new.description, new.notes);
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_delete
+        AFTER DELETE ON {source}
+        WHEN old.description != '' OR old.notes != ''
+        BEGIN
+            DELETE FROM {table} WHERE rowid = old.rowid AND entry_id = old.id;
+        END
+        """,
+        # Saving a model updates all the columns, so only the changed text is
+        # reindexed and stopping a timer doesn't touch the index
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_update
+        AFTER UPDATE OF description, notes ON {source}
+        WHEN old.description IS NOT new.description
+            OR old.notes IS NOT new.notes
+        BEGIN
+            DELETE FROM {table} WHERE rowid = old.rowid AND entry_id = old.id;
+            INSERT OR REPLACE INTO {table}
+                (rowid, entry_id, description, notes)
+            SELECT new.rowid, new.id, new.description, new.notes
+            WHERE {INDEXED};
+        END
+        """,
+    ]
+
+
+def drop(table: str) -> List[str]:
+    """Return the statements dropping the index table and its triggers."""
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_update",
+        f"DROP TRIGGER IF EXISTS {table}_delete",
+        f"DROP TRIGGER IF EXISTS {table}_insert",
+        f"DROP TABLE IF EXISTS {table}",
+    ]
+
+
+def fill(source: str, table: str) -> str:
+    """Return the statement indexing all the rows of a table."""
+    return f"""
+        INSERT INTO {table} (rowid, entry_id, description, notes)
+        SELECT rowid, id, description, notes FROM {source}
+        WHERE description != '' OR notes != ''
+    """
+
+
+# Matches in the description count twice as much as in the notes. Snippets
+# mark the matched terms with asterisks, which read the same in text and JSON.
+# Entries are joined by the rowid, an integer key lookup per match, and the
+# id guards against a stale index. User, project and task filters select
+# the allowed tasks once instead of joining them for every match.
+MATCH = """
+    SELECT
+        e.id,
+        bm25({table}, 0.0, 2.0, 1.0) AS rank,
+        snippet({table}, -1, '*', '*', '...', 12)
+    FROM {table}
+    INNER JOIN {source} e
+        ON e.rowid = {table}.rowid AND e.id = {table}.entry_id
+    WHERE {table} MATCH %s AND e.task_id IN (
+        SELECT t.id FROM traktor_task t
+        INNER JOIN traktor_project p ON p.id = t.project_id
+        WHERE p.user_id = %s {task_filters}
+    ) {filters}
+"""
+
+
+class EntrySearch:
+    @staticmethod
+    def is_available() -> bool:
+        """Full-text index exists only in SQLite databases."""
+        return connection.vendor == "sqlite"
+
+    @staticmethod
+    def install(cursor):
+        """Create the index tables and the triggers if they don't exist."""
+        for source, table in TABLES.items():
+            for sql in schema(source=source, table=table):
+                cursor.execute(sql)
+
+    @staticmethod
+    def uninstall(cursor):
+        for table in TABLES.values():
+            for sql in drop(table=table):
+                cursor.execute(sql)
+
+    @classmethod
+    def rebuild(cls):
+        """Recreate the triggers and reindex all the entries.
+
+        Needed only if the entries tables were recreated, which drops their
+        triggers and changes the rowids.
+        """
+        with connection.cursor() as cursor:
+            cls.install(cursor)
+            for source, table in TABLES.items():
+                cursor.execute(f"DELETE FROM {table}")
+                cursor.execute(fill(source=source, table=table))
+
+    @staticmethod
+    def match(
+        user_id: int,
+        query: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        project_id: Optional[str] = None,
+        task_id: Optional[str] = None,
+        limit: int = 20,
+        archived: bool = False,
+    ) -> List[Tuple[str, float, str]]:
+        """Return the ids, ranks and snippets of the best matches.
+
+        Args:
+            user_id (int): Primary key of the user.
+            query (str): FTS5 query.
+            start (datetime, optional): Only entries started at or after.
+            end (datetime, optional): Only entries started before.
+            project_id (str, optional): Project slug.
+            task_id (str, optional): Task slug.
+            limit (int): Maximal number of matches.
+            archived (bool): Search the archived entries too.
+        """
+        task_filters, params = [], [query, user_id]
+        if project_id is not None:
+            task_filters.append("AND p.slug = %s")
+            params.append(project_id)
+        if task_id is not None:
+            task_filters.append("AND t.slug = %s")
+            params.append(task_id)
+        filters = []
+        adapt = connection.ops.adapt_datetimefield_value
+        if start is not None:
+            filters.append("AND e.start_time >= %s")
+            params.append(adapt(start))
+        if end is not None:
+            filters.append("AND e.start_time < %s")
+            params.append(adapt(end))
+
+        sources = list(TABLES.items())
+        if not archived:
+            sources = sources[:1]
+        sql = " UNION ALL ".join(
+            MATCH.format(
+                source=source,
+                table=table,
+                task_filters=" ".join(task_filters),
+                filters=" ".join(filters),
+            )
+            for source, table in sources
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"{sql} ORDER BY rank LIMIT %s",
+                params * len(sources) + [limit],
+            )
+            return cursor.fetchall()
+
+
+@dataclass
+class Hit(VanillaModel):
+    """Entry found by the full-text search."""
+
+    HEADERS = VanillaModel.HEADERS + [
+        Column(title="Project", path="project"),
+        Column(title="Task", path="task"),
+        Column(
+            title="Start Time",
+            path=lambda o: ts.to_localtime_str(o.start_time),
+        ),
+        Column(title="Duration", path="running_time"),
+        Column(title="Match", path=lambda o: escape(o.snippet)),
+    ]
+
+    id: str
+    project: str
+    task: str
+    start_time: datetime
+    end_time: Optional[datetime]
+    duration: int
+    snippet: str
+    rank: float
+
+    @property
+    def running_time(self):
+        return ts.humanize(self.duration)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "project": self.project,
+            "task": self.task,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "running_time": ts.humanize(self.duration),
+            "snippet": self.snippet,
+            "rank": self.rank,
+        }
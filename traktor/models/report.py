@@ -1,3 +1,5 @@
+from datetime import date
+from typing import Optional
 from dataclasses import dataclass
 
 from tea import timestamp as ts
@@ -35,3 +37,72 @@ class Report(VanillaModel):
             "duration": self.duration,
             "running_time": ts.humanize(self.duration),
         }
+
+
+@dataclass
+class Total(VanillaModel):
+    """Time spent in a period, on a project or a task."""
+
+    HEADERS = VanillaModel.HEADERS + [
+        Column(title="Period", path="period_str"),
+        Column(title="Project", path="project"),
+        Column(title="Task", path="task"),
+        Column(title="Time", path="running_time", align=Column.Align.center),
+    ]
+
+    period: Optional[date]
+    project: str
+    task: str
+    duration: int
+
+    @property
+    def period_str(self) -> str:
+        return "" if self.period is None else self.period.isoformat()
+
+    @property
+    def running_time(self):
+        return ts.humanize(self.duration)
+
+    def to_dict(self) -> dict:
+        return {
+            "period": None if self.period is None else self.period.isoformat(),
+            "project": self.project,
+            "task": self.task,
+            "duration": self.duration,
+            "running_time": ts.humanize(self.duration),
+        }
+
+
+@dataclass
+class Percentile(VanillaModel):
+    """Percentile of the entry durations on a project or a task."""
+
+    HEADERS = VanillaModel.HEADERS + [
+        Column(title="Project", path="project"),
+        Column(title="Task", path="task"),
+        Column(title="Entries", path="count", align=Column.Align.right),
+        Column(
+            title="Percentile", path="percentile", align=Column.Align.right
+        ),
+        Column(title="Time", path="running_time", align=Column.Align.center),
+    ]
+
+    project: str
+    task: str
+    count: int
+    percentile: float
+    duration: int
+
+    @property
+    def running_time(self):
+        return ts.humanize(self.duration)
+
+    def to_dict(self) -> dict:
+        return {
+            "project": self.project,
+            "task": self.task,
+            "count": self.count,
+            "percentile": self.percentile,
+            "duration": self.duration,
+            "running_time": ts.humanize(self.duration),
+        }
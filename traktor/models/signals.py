@@ -1,8 +1,22 @@
+from enum import Enum
+
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import (
+    post_delete,
+    post_init,
+    post_save,
+    pre_delete,
+)
+
+from tea import timestamp as ts
 
+from traktor.config import config
 from traktor.models.project import Project
 from traktor.models.task import Task
+from traktor.models.entry import Entry
+from traktor.models.archived_entry import ArchivedEntry
+from traktor.models.daily_total import DailyTotal
 
 
 @receiver(post_save, sender=Project)
@@ -15,3 +29,110 @@ def create_default_task(sender, instance, created, **kwargs):
             default=True,
             color=instance.color,
         )
+
+
+@receiver(pre_delete, sender=Task)
+def stop_running_entry(sender, instance, **kwargs):
+    """Stop the timer running on the deleted task.
+
+    Entries of a deleted task are kept without the task, and a running one
+    would keep the user's timer running without a task to report it on.
+    """
+    running = Entry.objects.filter(task=instance, running_user__isnull=False)
+    for entry in running:
+        entry.stop()
+        entry.save(
+            update_fields=[
+                "end_time",
+                "duration",
+                "running_user",
+                "updated_on",
+            ]
+        )
+
+
+@receiver(pre_delete, sender=Task)
+def touch_task_entries(sender, instance, **kwargs):
+    """Mark the entries of the deleted task as updated.
+
+    Deleting the task clears the task of its entries with a queryset update
+    that doesn't change `updated_on`, so delta exports would miss them.
+    """
+    now = ts.now()
+    Entry.objects.filter(task=instance).update(updated_on=now)
+    ArchivedEntry.objects.filter(task=instance).update(updated_on=now)
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Apply the SQLite pragmas from the `[database]` configuration."""
+    if connection.vendor != "sqlite":
+        return
+
+    # Values are validated by the configuration, so they are safe to format.
+    # Busy timeout goes first, so the rest waits for the locks.
+    pragmas = [
+        ("busy_timeout", config.db_busy_timeout),
+        ("journal_mode", config.db_journal_mode),
+        ("synchronous", config.db_synchronous),
+        ("mmap_size", config.db_mmap_size),
+        ("cache_size", config.db_cache_size),
+        ("temp_store", config.db_temp_store),
+    ]
+    with connection.cursor() as cursor:
+        for name, value in pragmas:
+            if value is not None:
+                value = value.value if isinstance(value, Enum) else int(value)
+                cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def _entry_state(entry: Entry) -> tuple:
+    return entry.task_id, entry.start_time, entry.end_time, entry.duration
+
+
+def _update_rollup(state: tuple, sign: int, task: Task = None):
+    """Add or subtract the entry state to the daily totals."""
+    task_id, start_time, end_time, duration = state
+    if task_id is None or end_time is None:
+        # Running entries are not part of the rollup
+        return
+    if task is not None and task.pk == task_id:
+        user_id = task.project.user_id
+    else:
+        user_id = Task.objects.values_list("project__user_id", flat=True).get(
+            pk=task_id
+        )
+    DailyTotal.add(
+        user_id=user_id,
+        task_id=task_id,
+        start_time=start_time,
+        end_time=end_time,
+        duration=duration,
+        sign=sign,
+    )
+
+
+@receiver(post_init, sender=Entry)
+def snapshot_entry(sender, instance, **kwargs):
+    """Remember the loaded state to compute the rollup changes on save."""
+    instance._rollup_state = _entry_state(instance)
+
+
+@receiver(post_save, sender=Entry)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    """Move the entry contribution in the daily totals to the new state."""
+    old = None if created else instance._rollup_state
+    new = _entry_state(instance)
+    if old != new:
+        task = instance.task if instance.task_id is not None else None
+        if old is not None:
+            _update_rollup(old, sign=-1, task=task)
+        _update_rollup(new, sign=1, task=task)
+    instance._rollup_state = new
+
+
+@receiver(post_delete, sender=Entry)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove the entry contribution from the daily totals."""
+    task = instance.task if instance.task_id is not None else None
+    _update_rollup(instance._rollup_state, sign=-1, task=task)
@@ -0,0 +1,247 @@
+"""Opt-in instrumentation of the engine calls.
+
+Enabled with `traktor --profile` or the `TRAKTOR_PROFILE` environment
+variable. Every public engine method (`time_*`, `timer_*`, `entry_*`,
+`task_*`, `project_*` and `db.*`) is wrapped to record its wall time and the
+SQL statements executed while it runs. A summary is printed to stderr when the
+command finishes, so it doesn't mix with the command output. `--profile-stats`
+additionally writes cProfile statistics that can be inspected with `pstats` or
+`snakeviz`.
+
+Numbers are inclusive: a call that calls other engine methods counts their
+time and statements too. Generators are measured until they are exhausted,
+including the time the caller spends between the items.
+"""
+
+import time
+import heapq
+import inspect
+import cProfile
+import functools
+from pathlib import Path
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+from tea import serde
+from tea_console.table import Column, RichTableMixin
+
+from traktor.config import config
+
+
+@dataclass
+class Call(RichTableMixin):
+    HEADERS = [
+        Column(title="Call", path=lambda o: "  " * o.depth + o.name),
+        Column(title="Time (ms)", path="time_ms", align=Column.Align.right),
+        Column(title="Queries", path="queries", align=Column.Align.right),
+        Column(title="SQL (ms)", path="sql_ms", align=Column.Align.right),
+    ]
+
+    name: str
+    depth: int = 0
+    duration: float = 0.0
+    queries: int = 0
+    query_time: float = 0.0
+
+    @property
+    def time_ms(self) -> str:
+        return f"{self.duration * 1000:.2f}"
+
+    @property
+    def sql_ms(self) -> str:
+        return f"{self.query_time * 1000:.2f}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "queries": self.queries,
+            "query_time": self.query_time,
+        }
+
+
+@dataclass
+class Statement(RichTableMixin):
+    HEADERS = [
+        Column(title="SQL (ms)", path="sql_ms", align=Column.Align.right),
+        Column(title="Statement", path="short_sql"),
+    ]
+
+    duration: float
+    sql: str
+
+    @property
+    def sql_ms(self) -> str:
+        return f"{self.duration * 1000:.2f}"
+
+    @property
+    def short_sql(self) -> str:
+        return self.sql if len(self.sql) <= 120 else f"{self.sql[:117]}..."
+
+    def to_dict(self) -> dict:
+        return {"duration": self.duration, "sql": self.sql}
+
+
+class Profiler:
+    # Prefixes of the engine methods that are recorded
+    PREFIXES = ("time_", "timer_", "entry_", "task_", "project_")
+
+    def __init__(self, slowest: int = 10):
+        self.slowest = slowest
+        self.enabled = False
+        self.calls: List[Call] = []
+        self.counters = Counter()
+        self.queries = 0
+        self._statements: List[Tuple[float, int, str]] = []
+        self._active: List[Call] = []
+        self._started = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._stats_path: Optional[Path] = None
+
+    def enable(self, stats_path: Optional[Path] = None):
+        """Start recording.
+
+        Args:
+            stats_path (Path, optional): Write cProfile statistics to this
+                path when the report is printed.
+        """
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = time.perf_counter()
+        if stats_path is not None:
+            self._stats_path = stats_path
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+        from traktor.bootstrap import setup
+
+        setup()
+        from django.db import connection
+        from traktor.engine.engine import Engine, DBEngine
+
+        self._wrap_class(
+            Engine, "", lambda name: name.startswith(self.PREFIXES)
+        )
+        self._wrap_class(DBEngine, "db.", lambda name: True)
+        connection.execute_wrappers.append(self._execute)
+
+    def count(self, name: str, value: int = 1):
+        """Increment a named counter shown in the summary."""
+        if self.enabled:
+            self.counters[name] += value
+
+    def _wrap_class(self, cls, prefix: str, include: Callable[[str], bool]):
+        for name in dir(cls):
+            if name.startswith("_") or not include(name):
+                continue
+            attr = inspect.getattr_static(cls, name)
+            if isinstance(attr, (staticmethod, classmethod)):
+                wrapped = type(attr)(self._wrap(prefix + name, attr.__func__))
+            elif inspect.isfunction(attr):
+                wrapped = self._wrap(prefix + name, attr)
+            else:
+                continue
+            setattr(cls, name, wrapped)
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        @contextmanager
+        def record():
+            call = Call(name=name, depth=len(self._active))
+            self.calls.append(call)
+            self._active.append(call)
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                call.duration = time.perf_counter() - start
+                self._active.remove(call)
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                with record():
+                    yield from func(*args, **kwargs)
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with record():
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def _execute(self, execute, sql, params, many, context):
+        """Database execute wrapper that times every statement."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            for call in self._active:
+                call.queries += 1
+                call.query_time += duration
+            # Keep only the slowest statements
+            item = (duration, self.queries, sql)
+            if len(self._statements) < self.slowest:
+                heapq.heappush(self._statements, item)
+            else:
+                heapq.heappushpop(self._statements, item)
+
+    @property
+    def statements(self) -> List[Statement]:
+        """Slowest statements, the slowest first."""
+        return [
+            Statement(duration=duration, sql=sql)
+            for duration, _, sql in sorted(self._statements, reverse=True)
+        ]
+
+    def report(self):
+        """Print the summary to stderr and write the cProfile statistics."""
+        if not self.enabled:
+            return
+        total = time.perf_counter() - self._started
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(str(self._stats_path))
+
+        from rich.console import Console
+
+        console = Console(stderr=True)
+        if config.format == config.Format.json:
+            console.out(
+                serde.json_dumps(
+                    {
+                        "total": total,
+                        "queries": self.queries,
+                        "calls": self.calls,
+                        "statements": self.statements,
+                        "counters": dict(self.counters),
+                    }
+                )
+            )
+            return
+
+        table = Call.get_rich_table()
+        for call in self.calls:
+            table.add_row(*call.to_rich_row())
+        console.print(table)
+        if len(self._statements) > 0:
+            table = Statement.get_rich_table()
+            for statement in self.statements:
+                table.add_row(*statement.to_rich_row())
+            console.print(table)
+        summary = f"Total {total * 1000:.2f} ms, {self.queries} queries"
+        for name, value in sorted(self.counters.items()):
+            summary += f", {value} {name}"
+        console.print(summary, highlight=False)
+        if self._stats_path is not None:
+            console.print(f"cProfile statistics written to {self._stats_path}")
+
+
+profiler = Profiler()
@@ -41,9 +41,14 @@ INSTALLED_APPS = [
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
+# Traktor's own backends, other engines use Django's
+ENGINES = {"sqlite3": "traktor.backends.sqlite3"}
+
 DATABASES = {
     "default": {
-        "ENGINE": f"django.db.backends.{config.db_engine}",
+        "ENGINE": ENGINES.get(
+            config.db_engine, f"django.db.backends.{config.db_engine}"
+        ),
         "NAME": config.db_name,
         "USER": config.db_user,
         "PASSWORD": config.db_password,
@@ -0,0 +1,52 @@
+"""Test configuration.
+
+Tests run against a database in a temporary home directory, so they never
+touch the user's configuration and data. The home directory is set before
+the configuration is imported, and it's inherited by the subprocesses that
+the tests start. Django is set up before the test modules are collected,
+so they can import the models.
+"""
+
+import os
+import uuid
+import shutil
+import tempfile
+
+import pytest
+
+
+def pytest_configure(config):
+    config.traktor_home = tempfile.mkdtemp(prefix="traktor-tests-")
+    os.environ["HOME"] = config.traktor_home
+
+    from traktor.bootstrap import setup
+
+    setup()
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(config.traktor_home, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def engine():
+    """Migrate the test database and return the engine."""
+    from traktor.engine import engine
+
+    engine.db.ensure()
+    return engine
+
+
+@pytest.fixture
+def user(engine):
+    """Create a new user, so the tests don't share projects and timers."""
+    from traktor.models import User
+
+    return User.objects.create(username=f"user-{uuid.uuid4().hex[:8]}")
+
+
+@pytest.fixture
+def task(engine, user):
+    """Create a project with a task."""
+    project = engine.project_create(user=user, name="Project")
+    return engine.task_create(user=user, project_id=project.slug, name="Task")
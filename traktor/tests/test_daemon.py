@@ -0,0 +1,93 @@
+import socket
+import threading
+
+import pytest
+
+from traktor import daemon
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """Fake daemon that answers every request with the given bytes.
+
+    Answer is sent after the given delay, or the connection is closed
+    without an answer if it's None.
+    """
+    monkeypatch.setattr(daemon, "TIMEOUT", 0.5)
+    path = daemon.socket_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    sock.listen(1)
+    state = {"answer": None, "delay": 0, "requests": 0}
+    stop = threading.Event()
+
+    def serve():
+        sock.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                conn, _ = sock.accept()
+            except socket.timeout:
+                continue
+            with conn, conn.makefile("rwb") as f:
+                f.readline()
+                state["requests"] += 1
+                stop.wait(state["delay"])
+                if state["answer"] is not None:
+                    f.write(state["answer"])
+
+    thread = threading.Thread(target=serve)
+    thread.start()
+    yield state
+    stop.set()
+    thread.join()
+    sock.close()
+    path.unlink()
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--config-path=/tmp/traktor.ini", "status"],
+        ["--profile-stats=/tmp/stats", "status"],
+        ["--profile", "status"],
+        ["status", "--help"],
+        ["project", "list"],
+    ],
+)
+def test_local_only_arguments(server, args):
+    server["answer"] = b'{"exit_code": 0, "stdout": "", "stderr": ""}\n'
+    assert daemon.forward(args) is None
+    assert server["requests"] == 0
+
+
+def test_forward(server, capsys):
+    server["answer"] = b'{"exit_code": 3, "stdout": "out", "stderr": "err"}\n'
+    assert daemon.forward(["--format=json", "status"]) == 3
+    assert capsys.readouterr() == ("out", "err")
+
+
+def test_slow_answer(server, capsys):
+    server["answer"] = b'{"exit_code": 0, "stdout": "out", "stderr": ""}\n'
+    # Longer than the timeout, the command may be waiting for a lock
+    server["delay"] = 1
+    assert daemon.forward(["stop"]) == 0
+    assert capsys.readouterr() == ("out", "")
+
+
+@pytest.mark.parametrize(
+    "answer", [b"", b"\n", b"not json\n", b'{"stdout": ""}\n', b"[]\n", None]
+)
+def test_invalid_answer_is_an_error(server, capsys, answer):
+    server["answer"] = answer
+    # Daemon may have executed the command, so it's not executed again
+    assert daemon.forward(["stop"]) == 1
+    assert server["requests"] == 1
+    out, err = capsys.readouterr()
+    assert out == ""
+    assert "may have been executed" in err
+
+
+def test_no_daemon():
+    assert not daemon.socket_path().exists()
+    assert daemon.forward(["status"]) is None
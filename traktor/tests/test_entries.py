@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from tea import timestamp as ts
+
+from traktor.models import Entry
+
+
+def test_entry_list_pages(engine, user, task):
+    other = engine.task_create(
+        user=user, project_id=task.project.slug, name="Other"
+    )
+    start_time = ts.now() - timedelta(days=10)
+    entries = []
+    for i in range(7):
+        # Entries that start at the same time are ordered by the id
+        for t in (task, other):
+            entries.append(
+                Entry.objects.create(
+                    task=t,
+                    start_time=start_time + timedelta(hours=i // 2),
+                    end_time=start_time + timedelta(hours=i // 2, minutes=5),
+                    duration=300,
+                )
+            )
+    entries.sort(key=lambda entry: (entry.start_time, entry.id))
+    # Half of the entries are archived and merged back in order
+    engine.db.archive(before=start_time + timedelta(hours=2))
+
+    for page_size in (1, 2, 3, 500):
+        listed = list(engine.entry_list(user=user, page_size=page_size))
+        assert [entry.id for entry in listed] == [e.id for e in entries]
+
+    listed = engine.entry_list(
+        user=user, project_id=task.project.slug, task_id=other.slug
+    )
+    assert [entry.id for entry in listed] == [
+        e.id for e in entries if e.task_id == other.pk
+    ]
@@ -0,0 +1,76 @@
+import array
+import threading
+from datetime import timedelta
+
+from django.db import connection
+from tea import timestamp as ts
+
+from traktor.models import Entry
+from traktor.engine.entry_cache import EntryCache, to_micros
+
+
+def create_entries(task, count: int, days: int):
+    start_time = ts.now() - timedelta(days=days)
+    for i in range(count):
+        Entry.objects.create(
+            task=task,
+            start_time=start_time + timedelta(hours=i),
+            end_time=start_time + timedelta(hours=i, minutes=30),
+            duration=1800,
+        )
+
+
+def assert_cached(cache: EntryCache, user):
+    starts = sorted(
+        to_micros(start_time)
+        for start_time in Entry.objects.filter(
+            task__project__user=user
+        ).values_list("start_time", flat=True)
+    )
+    assert cache.rows == len(starts)
+    for name, code in EntryCache.COLUMNS.items():
+        size = (cache.path / name).stat().st_size
+        assert size == cache.rows * array.array(code).itemsize
+    assert (cache.path / "ids").stat().st_size == cache.rows * 16
+    with cache.columns() as c:
+        assert sorted(int(start) for start in c.start) == starts
+
+
+def test_refresh_overwrites_interrupted_rows(engine, user, task):
+    create_entries(task, count=3, days=2)
+    cache = engine.entry_cache(user=user)
+    assert cache.rows == 3
+
+    # Refresh that was interrupted after writing the columns
+    for name in list(EntryCache.COLUMNS) + ["ids"]:
+        with (cache.path / name).open("ab") as f:
+            f.write(b"\xff" * 64)
+
+    create_entries(task, count=2, days=1)
+    cache = engine.entry_cache(user=user)
+    assert_cached(cache, user)
+
+
+def test_concurrent_refreshes(engine, user, task):
+    create_entries(task, count=3, days=2)
+    engine.entry_cache(user=user)
+    create_entries(task, count=5, days=1)
+
+    errors = []
+
+    def refresh():
+        try:
+            EntryCache(user=user).refresh()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=refresh) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert_cached(EntryCache(user=user), user)
@@ -0,0 +1,79 @@
+from django.db import connection
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from tea import timestamp as ts
+
+from traktor.models import DailyTotal, Entry
+
+
+def scans(plan: str, table: str) -> bool:
+    return f"SCAN {table}" in plan
+
+
+def test_running_entry_uses_running_user_index(engine, user):
+    # Running entry is found by the unique per-user pointer
+    p = Entry.objects.filter(running_user=user).explain()
+    assert "SEARCH traktor_entry USING INDEX" in p
+    assert "(running_user_id=?)" in p
+    assert not scans(p, "traktor_entry")
+    # Running entries are not looked up by the task any more
+    with connection.cursor() as cursor:
+        indexes = connection.introspection.get_constraints(
+            cursor, Entry._meta.db_table
+        )
+    assert "entry_running_idx" not in indexes
+
+
+def test_running_entry_of_task_uses_task_index(engine, task):
+    # Deleting the task stops its running entry
+    p = Entry.objects.filter(task=task, running_user__isnull=False).explain()
+    assert "USING INDEX entry_task_start_time_idx (task_id=?)" in p
+    assert not scans(p, "traktor_entry")
+
+
+def test_time_range_uses_task_start_time_index(engine, user):
+    now = ts.now()
+    p = Entry.objects.filter(
+        task__project__user=user, start_time__gte=now, start_time__lt=now
+    ).explain()
+    assert "USING INDEX entry_task_start_time_idx" in p
+    assert not scans(p, "traktor_entry")
+
+
+def test_changed_entries_use_updated_on_index(engine):
+    p = Entry.objects.filter(updated_on__gte=ts.now()).explain()
+    assert "USING INDEX entry_updated_on_idx" in p
+    assert not scans(p, "traktor_entry")
+
+
+def test_longest_entry_uses_duration_index(engine):
+    # Aggregate query has no queryset to explain, the executed one is
+    with CaptureQueriesContext(connection) as context:
+        Entry.objects.aggregate(Max("duration"))
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {context[0]['sql']}")
+        p = "\n".join(row[-1] for row in cursor.fetchall())
+    assert "COVERING INDEX entry_duration_idx" in p
+
+
+def test_report_uses_daily_total_index(engine, user):
+    p = DailyTotal.objects.filter(
+        user=user, day__gte=ts.now().date()
+    ).explain()
+    assert "SEARCH traktor_dailytotal USING INDEX" in p
+    assert not scans(p, "traktor_dailytotal")
+
+
+def test_entry_pages_use_start_time_id_index(engine, user, task):
+    start_time = ts.now()
+    for _ in range(3):
+        Entry.objects.create(task=task, start_time=start_time)
+    with CaptureQueriesContext(connection) as context:
+        assert len(list(engine.entry_list(user=user, page_size=1))) == 3
+
+    # Pages after the first continue after the last row of the previous
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {context[-1]['sql']}")
+        p = "\n".join(row[-1] for row in cursor.fetchall())
+    assert "USING INDEX entry_start_time_id_idx ((start_time,id)>(?,?))" in p
+    assert "TEMP B-TREE" not in p
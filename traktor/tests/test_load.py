@@ -0,0 +1,152 @@
+import json
+import uuid
+from datetime import timedelta
+
+import pytest
+
+from tea import timestamp as ts
+
+from traktor import errors
+from traktor.models import ArchivedEntry, Entry
+
+
+def test_load_keeps_archived_timestamps(engine, task, tmp_path):
+    start_time = (ts.now() - timedelta(days=30)).replace(microsecond=0)
+    entry = Entry.objects.create(
+        task=task,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        duration=3600,
+    )
+    engine.db.archive(before=start_time + timedelta(days=1))
+    ArchivedEntry.objects.filter(pk=entry.pk).update(
+        created_on=start_time, updated_on=start_time
+    )
+
+    path = tmp_path / "archive.json"
+    engine.db.export(path)
+    engine.db.load(path)
+
+    archived = ArchivedEntry.objects.get(pk=entry.pk)
+    assert archived.created_on == start_time
+    assert archived.updated_on == start_time
+
+
+def test_load_running_entry_without_running_user(engine, user, task, tmp_path):
+    entry = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    path = tmp_path / "export.json"
+    engine.db.export(path)
+    # Export made before the entries had the running user
+    data = json.loads(path.read_text(encoding="utf-8"))
+    for record in data["entries"]:
+        if uuid.UUID(record["task_id"]) == task.pk:
+            del record["running_user_id"]
+    path.write_text(json.dumps(data), encoding="utf-8")
+    Entry.objects.filter(pk=entry.pk).delete()
+
+    engine.db.load(path)
+    assert engine.timer_status(user=user).pk == entry.pk
+
+
+def test_load_running_entry_conflict(engine, user, task, tmp_path):
+    entry = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    path = tmp_path / "export.json"
+    engine.db.export(path)
+    # Loading the same running entry replaces it
+    engine.db.load(path)
+    assert engine.timer_status(user=user).pk == entry.pk
+
+    engine.timer_stop(user=user)
+    Entry.objects.filter(pk=entry.pk).delete()
+    running = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    with pytest.raises(errors.ImportedTimerConflict):
+        engine.db.load(path)
+    assert engine.timer_status(user=user).pk == running.pk
+    assert not Entry.objects.filter(pk=entry.pk).exists()
+
+
+def test_load_running_entries_in_different_batches(
+    engine, user, task, tmp_path
+):
+    now = ts.now().replace(microsecond=0)
+    older = Entry.objects.create(
+        task=task, start_time=now - timedelta(hours=3)
+    )
+    newer = Entry.objects.create(
+        task=task, start_time=now - timedelta(hours=1), running_user=user
+    )
+    path = tmp_path / "export.json"
+    engine.db.export(path)
+    # Export made before the entries had the running user
+    data = json.loads(path.read_text(encoding="utf-8"))
+    for record in data["entries"]:
+        del record["running_user_id"]
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    engine.db.load(path, batch_size=1)
+    assert engine.timer_status(user=user).pk == newer.pk
+    # Older running entry is stopped when the newer one started
+    older.refresh_from_db()
+    assert older.running_user_id is None
+    assert older.end_time == newer.start_time
+    assert older.duration == 2 * 3600
+
+
+def test_load_delta_stops_and_starts_in_different_batches(
+    engine, user, task, tmp_path
+):
+    stopped = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    engine.timer_stop(user=user)
+    running = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    path = tmp_path / "export.json"
+    engine.db.export(path)
+    # Running entry comes first
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["entries"].sort(key=lambda record: record["end_time"] is not None)
+    path.write_text(json.dumps(data), encoding="utf-8")
+    # Database from before the stopped entry was stopped
+    Entry.objects.filter(pk=running.pk).delete()
+    Entry.objects.filter(pk=stopped.pk).update(
+        end_time=None, duration=0, running_user=user
+    )
+
+    engine.db.load(path, batch_size=1)
+    assert engine.timer_status(user=user).pk == running.pk
+    assert Entry.objects.get(pk=stopped.pk).end_time is not None
+
+
+def test_delta_export_has_entries_of_deleted_task(
+    engine, user, task, tmp_path
+):
+    start_time = (ts.now() - timedelta(days=30)).replace(microsecond=0)
+    entry = Entry.objects.create(
+        task=task,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+    )
+    Entry.objects.filter(pk=entry.pk).update(updated_on=start_time)
+    engine.db.export(tmp_path / "full.json")
+    since = engine.db.export_watermark()
+
+    engine.task_delete(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    path = tmp_path / "delta.json"
+    engine.db.export(path, since=since)
+
+    records = json.loads(path.read_text(encoding="utf-8"))["entries"]
+    assert [
+        record["task_id"]
+        for record in records
+        if uuid.UUID(record["id"]) == entry.pk
+    ] == [None]
@@ -0,0 +1,98 @@
+import ast
+import importlib
+from pathlib import Path
+from datetime import timedelta
+
+import pytest
+from django.apps import apps
+from tea import timestamp as ts
+
+from traktor.models import DailyTotal, Entry
+
+
+# Migrations that run code, schema migrations may refer to field defaults
+DATA_MIGRATIONS = sorted(
+    path
+    for path in (Path(__file__).parents[1] / "migrations").glob("[0-9]*.py")
+    if "RunPython" in path.read_text(encoding="utf-8")
+)
+
+
+def imported_modules(path: Path):
+    for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+        if isinstance(node, ast.Import):
+            yield from (alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            yield node.module
+
+
+@pytest.mark.parametrize("path", DATA_MIGRATIONS, ids=lambda path: path.stem)
+def test_data_migration_doesnt_import_application_code(path):
+    # Migrations must keep working after the models and helpers change
+    for module in imported_modules(path):
+        assert not module.startswith("traktor"), module
+
+
+def test_fill_daily_totals(engine, user, task):
+    # Entry spanning midnight contributes to both days
+    start_time = ts.now() - timedelta(days=3, hours=1)
+    for hours in range(1, 4):
+        Entry.objects.create(
+            task=task,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=hours, minutes=7),
+            duration=hours * 3600 + 7 * 60,
+        )
+    expected = set(
+        DailyTotal.objects.filter(user=user).values_list(
+            "task_id", "day", "duration"
+        )
+    )
+    assert len(expected) > 0
+
+    migration = importlib.import_module("traktor.migrations.0008_daily_total")
+    DailyTotal.objects.all().delete()
+    try:
+        migration.fill_daily_totals(apps, None)
+        assert (
+            set(
+                DailyTotal.objects.filter(user=user).values_list(
+                    "task_id", "day", "duration"
+                )
+            )
+            == expected
+        )
+    finally:
+        DailyTotal.rebuild()
+
+
+def test_fill_running_user_stops_older_running_entries(engine, user, task):
+    # Entries from before the running user, the user has two running ones
+    now = ts.now().replace(microsecond=0)
+    older = Entry.objects.create(
+        task=task, start_time=now - timedelta(hours=3)
+    )
+    newer = Entry.objects.create(
+        task=task, start_time=now - timedelta(hours=1)
+    )
+
+    migration = importlib.import_module(
+        "traktor.migrations.0009_entry_running_user"
+    )
+    migration.fill_running_user(apps, None)
+
+    newer.refresh_from_db()
+    assert newer.running_user_id == user.pk
+    assert newer.end_time is None
+    older.refresh_from_db()
+    assert older.running_user_id is None
+    assert older.end_time == newer.start_time
+    assert older.duration == 2 * 3600
+    assert (
+        sum(
+            DailyTotal.objects.filter(user=user).values_list(
+                "duration", flat=True
+            )
+        )
+        == 2 * 3600
+    )
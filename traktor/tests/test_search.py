@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from tea import timestamp as ts
+
+from traktor.models import ArchivedEntry, Entry
+
+
+def test_search_finds_archived_entries(engine, user, task):
+    start_time = ts.now() - timedelta(days=60)
+    old = Entry.objects.create(
+        task=task,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        duration=3600,
+        description="Deploy the archived release",
+    )
+    new = Entry.objects.create(
+        task=task,
+        start_time=ts.now() - timedelta(hours=2),
+        end_time=ts.now() - timedelta(hours=1),
+        duration=3600,
+        description="Deploy the new release",
+    )
+    engine.db.archive(before=start_time + timedelta(days=1))
+    assert ArchivedEntry.objects.filter(pk=old.pk).exists()
+
+    hits = engine.entry_search(user=user, query="deploy")
+    assert {hit.id for hit in hits} == {old.id.hex, new.id.hex}
+
+    hits = engine.entry_search(user=user, query="archived")
+    assert [hit.id for hit in hits] == [old.id.hex]
+    assert hits[0].snippet == "Deploy the *archived* release"
+
+    # Range after the archive doesn't read it
+    hits = engine.entry_search(
+        user=user, query="deploy", start=ts.now() - timedelta(days=1)
+    )
+    assert [hit.id for hit in hits] == [new.id.hex]
+
+
+def test_search_index_follows_archived_entries(engine, user, task):
+    start_time = ts.now() - timedelta(days=60)
+    entry = Entry.objects.create(
+        task=task,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        duration=3600,
+        notes="Quarterly planning",
+    )
+    engine.db.archive(before=start_time + timedelta(days=1))
+    assert len(engine.entry_search(user=user, query="quarterly")) == 1
+
+    ArchivedEntry.objects.filter(pk=entry.pk).update(notes="Yearly planning")
+    assert engine.entry_search(user=user, query="quarterly") == []
+    assert len(engine.entry_search(user=user, query="yearly")) == 1
+
+    ArchivedEntry.objects.filter(pk=entry.pk).delete()
+    assert engine.entry_search(user=user, query="yearly") == []
@@ -0,0 +1,51 @@
+import sys
+import subprocess
+from pathlib import Path
+
+# Top level imports of `traktor --help` take about 170 ms, and about 450 ms
+# with Django set up and the engine loaded
+BUDGET_US = 300_000
+
+
+def import_times(*args: str) -> dict:
+    """Run traktor and return the cumulative import times in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "traktor", *args],
+        cwd=Path(__file__).parents[2],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.rstrip()] = int(cumulative)
+    return times
+
+
+def test_help_doesnt_import_django():
+    times = import_times("--help")
+    modules = {name.strip() for name in times}
+    assert "traktor.commands.main" in modules
+    django = [
+        name
+        for name in modules
+        if name == "django" or name.startswith("django.")
+    ]
+    assert django == []
+
+
+def test_help_import_time():
+    # Best of three, the first run also compiles the bytecode
+    total = min(
+        sum(
+            cumulative
+            for name, cumulative in import_times("--help").items()
+            if not name.startswith("  ")
+        )
+        for _ in range(3)
+    )
+    assert total < BUDGET_US, f"{total / 1000:.0f} ms"
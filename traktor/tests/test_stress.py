@@ -0,0 +1,102 @@
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+from django.db.models import Sum
+
+from traktor.models import DailyTotal, Entry, User
+
+PROCESSES = 12
+USERS = 4
+PAIRS = 25
+
+# Starts and stops the timer of a user. Waits with the first start until all
+# the processes are set up. Expected errors are counted, any other error
+# fails the process.
+WORKER = """
+import sys
+import json
+
+from traktor.bootstrap import setup
+
+setup()
+
+from traktor import errors
+from traktor.engine import engine
+from traktor.models import User
+
+user = User.objects.get(username=sys.argv[1])
+print("ready", flush=True)
+sys.stdin.readline()
+
+counts = {"started": 0, "stopped": 0, "running": 0, "not_running": 0}
+for _ in range(int(sys.argv[3])):
+    try:
+        engine.timer_start(user=user, project_id=sys.argv[2])
+        counts["started"] += 1
+    except errors.TimerAlreadyRunning:
+        counts["running"] += 1
+    try:
+        engine.timer_stop(user=user)
+        counts["stopped"] += 1
+    except errors.TimerIsNotRunning:
+        counts["not_running"] += 1
+print(json.dumps(counts))
+"""
+
+
+def test_concurrent_start_stop(engine):
+    users = []
+    for i in range(USERS):
+        user = User.objects.create(username=f"stress-{i}")
+        engine.project_create(user=user, name="Stress")
+        users.append(user)
+
+    processes = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                WORKER,
+                users[i % USERS].username,
+                "stress",
+                str(PAIRS),
+            ],
+            cwd=Path(__file__).parents[2],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        for i in range(PROCESSES)
+    ]
+    for process in processes:
+        assert process.stdout.readline() == "ready\n", process.stderr.read()
+    for process in processes:
+        process.stdin.write("go\n")
+        process.stdin.flush()
+
+    counts = {"started": 0, "stopped": 0, "running": 0, "not_running": 0}
+    for process in processes:
+        stdout, stderr = process.communicate(timeout=300)
+        assert process.returncode == 0, stderr
+        for name, count in json.loads(stdout).items():
+            counts[name] += count
+    assert counts["started"] + counts["running"] == PROCESSES * PAIRS
+    assert counts["stopped"] + counts["not_running"] == PROCESSES * PAIRS
+
+    # Every start created an entry and every stop finished one. Entries
+    # left running are the users' running timers, at most one per user.
+    entries = Entry.objects.filter(task__project__user__in=users)
+    assert entries.count() == counts["started"]
+    running = entries.filter(end_time=None)
+    assert running.count() == counts["started"] - counts["stopped"]
+    assert running.filter(running_user__isnull=True).count() == 0
+    for user in users:
+        assert running.filter(running_user=user).count() <= 1
+        # Daily totals add up under the concurrent stops
+        total = DailyTotal.objects.filter(user=user).aggregate(Sum("duration"))
+        assert total == entries.filter(
+            task__project__user=user, end_time__isnull=False
+        ).aggregate(Sum("duration"))
@@ -0,0 +1,194 @@
+from datetime import timedelta
+
+import pytest
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from tea import timestamp as ts
+
+from traktor import errors
+from traktor.enums import Bucket, GroupBy
+from traktor.models import ArchivedEntry, DailyTotal, Entry
+
+
+def statements(context: CaptureQueriesContext) -> list:
+    """Return the captured statements without the transaction control."""
+    control = ("BEGIN", "SAVEPOINT", "RELEASE", "COMMIT", "ROLLBACK")
+    return [
+        query["sql"]
+        for query in context.captured_queries
+        if not query["sql"].startswith(control)
+    ]
+
+
+def test_timer_already_running(engine, user, task):
+    entry = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    with pytest.raises(errors.TimerAlreadyRunning):
+        engine.timer_start(
+            user=user, project_id=task.project.slug, task_id=task.slug
+        )
+    assert engine.timer_status(user=user).pk == entry.pk
+
+
+def test_timer_start_keeps_other_integrity_errors(
+    engine, user, task, monkeypatch
+):
+    message = "NOT NULL constraint failed: traktor_entry.start_time"
+
+    def create(**kwargs):
+        raise IntegrityError(message)
+
+    monkeypatch.setattr(Entry.objects, "create", create)
+    with pytest.raises(IntegrityError, match=message):
+        engine.timer_start(
+            user=user, project_id=task.project.slug, task_id=task.slug
+        )
+
+
+def fail_creates(monkeypatch, failures: int):
+    """Fail the entry inserts as if a running timer was stopped meanwhile."""
+    create = Entry.objects.create
+    calls = []
+
+    def create_after_failures(**kwargs):
+        calls.append(kwargs)
+        if len(calls) <= failures:
+            raise IntegrityError(
+                "UNIQUE constraint failed: traktor_entry.running_user_id"
+            )
+        return create(**kwargs)
+
+    monkeypatch.setattr(Entry.objects, "create", create_after_failures)
+
+
+def test_timer_start_after_running_timer_stopped(
+    engine, user, task, monkeypatch
+):
+    fail_creates(monkeypatch, failures=1)
+    entry = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    assert engine.timer_status(user=user).pk == entry.pk
+
+
+def test_timer_start_gives_up(engine, user, task, monkeypatch):
+    fail_creates(monkeypatch, failures=3)
+    with pytest.raises(IntegrityError, match="running_user_id"):
+        engine.timer_start(
+            user=user, project_id=task.project.slug, task_id=task.slug
+        )
+
+
+def test_delete_task_stops_timer(engine, user, task):
+    entry = engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    engine.task_delete(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+
+    entry = Entry.objects.get(pk=entry.pk)
+    assert entry.task is None
+    assert entry.running_user is None
+    assert entry.end_time is not None
+    assert not DailyTotal.objects.filter(task_id=task.pk).exists()
+    with pytest.raises(errors.TimerIsNotRunning):
+        engine.timer_status(user=user)
+
+    # Reports skip the entries without a task
+    assert engine.timer_report(user=user) == []
+    assert engine.timer_today(user=user) == []
+    assert engine.timer_series(user=user, bucket=Bucket.day) == []
+
+    # Timer can be started again
+    engine.timer_start(user=user, project_id=task.project.slug)
+    assert engine.timer_status(user=user).task.default
+
+
+def test_delete_project_stops_timer(engine, user, task):
+    engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    engine.project_delete(user=user, project_id=task.project.slug)
+
+    with pytest.raises(errors.TimerIsNotRunning):
+        engine.timer_status(user=user)
+    assert engine.timer_report(user=user) == []
+
+
+def test_timer_query_budget(engine, user, task):
+    project_id, task_id = task.project.slug, task.slug
+    # Warm up the slug cache
+    engine.timer_start(user=user, project_id=project_id, task_id=task_id)
+    engine.timer_stop(user=user)
+    # Stop adds the first time of the day
+    DailyTotal.objects.filter(user=user).delete()
+
+    with CaptureQueriesContext(connection) as start:
+        engine.timer_start(user=user, project_id=project_id, task_id=task_id)
+    with CaptureQueriesContext(connection) as stop:
+        engine.timer_stop(user=user)
+
+    # Task lookup and the insert
+    assert len(statements(start)) <= 2, statements(start)
+    # Running entry lookup, its update and the rollup upsert
+    assert len(statements(stop)) <= 3, statements(stop)
+
+
+def create_entry(task, start_time, hours):
+    return Entry.objects.create(
+        task=task,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=hours),
+    )
+
+
+def spent(engine, user, start, end) -> int:
+    reports = engine.time_spent(
+        user=user, start=start, end=end, group_by=GroupBy.project
+    )
+    return sum(report.duration for report in reports)
+
+
+def test_time_spent_clips_entries(engine, user, task):
+    start = ts.now().replace(microsecond=0) - timedelta(days=10)
+    end = start + timedelta(hours=10)
+    # Before and after the window
+    create_entry(task, start - timedelta(hours=3), hours=2)
+    create_entry(task, end, hours=2)
+    # Crossing the start, inside and crossing the end
+    create_entry(task, start - timedelta(hours=1), hours=3)
+    create_entry(task, start + timedelta(hours=4), hours=1)
+    create_entry(task, end - timedelta(minutes=30), hours=2)
+
+    reports = engine.time_spent(user=user, start=start, end=end)
+    assert [(r.project, r.task, r.duration) for r in reports] == [
+        (task.project.name, task.name, 2 * 3600 + 3600 + 1800)
+    ]
+
+
+def test_time_spent_running_entry(engine, user, task):
+    now = ts.now()
+    engine.timer_start(
+        user=user, project_id=task.project.slug, task_id=task.slug
+    )
+    Entry.objects.filter(running_user=user).update(
+        start_time=now - timedelta(hours=2)
+    )
+    # Running entry that lost the running user is not counted
+    Entry.objects.create(task=task, start_time=now - timedelta(hours=1))
+
+    duration = spent(engine, user, now - timedelta(hours=1), now)
+    assert 3600 <= duration <= 3600 + 60
+
+
+def test_time_spent_archived_entries(engine, user, task):
+    start = ts.now().replace(microsecond=0) - timedelta(days=20)
+    end = start + timedelta(hours=10)
+    create_entry(task, start - timedelta(hours=1), hours=3)
+    create_entry(task, end - timedelta(hours=1), hours=2)
+    engine.db.archive(before=end + timedelta(days=1))
+    assert ArchivedEntry.objects.filter(task=task).count() == 2
+
+    assert spent(engine, user, start, end) == 2 * 3600 + 3600